@@ -0,0 +1,203 @@
+import numpy as np
+from db.database import create_connection
+
+# Górne granice klas indeksu jakości powietrza GIOŚ (µg/m3) dla wartości 1-godzinnych.
+# Wartość <= pierwszej granicy to "Bardzo dobry", powyżej ostatniej - "Bardzo zły".
+POLLUTANT_THRESHOLDS = {
+    "PM10": [20, 50, 80, 110, 150],
+    "PM2.5": [13, 35, 55, 75, 110],
+    "NO2": [40, 100, 150, 230, 400],
+    "SO2": [50, 100, 200, 350, 500],
+    "O3": [70, 120, 150, 180, 240],
+}
+
+# Kolejność zanieczyszczeń odpowiada kolumnom tabeli air_quality_index
+POLLUTANTS = ["PM10", "PM2.5", "NO2", "SO2", "O3"]
+
+INDEX_LEVELS = ["Bardzo dobry", "Dobry", "Umiarkowany", "Dostateczny", "Zły", "Bardzo zły"]
+
+NO_INDEX = -1
+
+
+def compute_sub_indices(values, param_key):
+    """
+    Wylicza indeksy cząstkowe (0-5) dla tablicy wartości jednego zanieczyszczenia.
+    Obliczenie jest wektorowe - cała tablica jest klasyfikowana jednym wywołaniem np.searchsorted.
+    """
+    bounds = np.asarray(POLLUTANT_THRESHOLDS[param_key], dtype=float)
+    return np.searchsorted(bounds, np.asarray(values, dtype=float), side="left")
+
+
+def compute_all_sub_indices(param_keys, values):
+    """
+    Wylicza indeksy cząstkowe dla tablic kodów zanieczyszczeń i wartości (dowolne zanieczyszczenia wymieszane).
+    Dla zanieczyszczeń spoza indeksu zwracana jest wartość NO_INDEX.
+    """
+    param_keys = np.asarray(param_keys)
+    values = np.asarray(values, dtype=float)
+    sub_indices = np.full(len(values), NO_INDEX, dtype=int)
+
+    for param_key in POLLUTANTS:
+        mask = param_keys == param_key
+        if mask.any():
+            sub_indices[mask] = compute_sub_indices(values[mask], param_key)
+
+    return sub_indices
+
+
+def _touched_hours(cursor, last_id, max_id):
+    """
+    Wyznacza pary (stacja, godzina) z pomiarów o ID z przedziału (last_id, max_id]
+    (zakres klucza głównego, więc bez przeglądania całej tabeli).
+
+    Zwraca zbiór par oraz warunek SQL z parametrami ograniczający pomiary do czujników
+    tych stacji i okna dat nowych pomiarów - taki warunek korzysta z indeksu (sensor_id, date).
+    """
+    cursor.execute("""
+        SELECT DISTINCT s.station_id, substr(m.date, 1, 13)
+        FROM measurements m
+        JOIN sensors s ON s.id_sensor = m.sensor_id
+        WHERE m.id > ? AND m.id <= ?
+    """, (last_id, max_id))
+    touched = set(cursor.fetchall())
+    if not touched:
+        return touched, "", []
+
+    stations = sorted({station_id for station_id, _ in touched})
+    cursor.execute(
+        f"SELECT id_sensor FROM sensors WHERE station_id IN ({', '.join('?' for _ in stations)})", stations
+    )
+    sensor_ids = [r[0] for r in cursor.fetchall()]
+    hours = [hour for _, hour in touched]
+    conditions = f"""
+              AND m.sensor_id IN ({', '.join('?' for _ in sensor_ids)})
+              AND m.date >= ? AND m.date <= ?
+    """
+    return touched, conditions, [*sensor_ids, min(hours), max(hours) + "~"]
+
+
+def update_air_quality_index(full=False):
+    """
+    Aktualizuje tabelę air_quality_index dla wszystkich stacji we własnym połączeniu
+    (szczegóły w write_air_quality_index). Zwraca liczbę przeliczonych par (stacja, godzina).
+    """
+    conn = create_connection()
+    try:
+        updated = write_air_quality_index(conn.cursor(), full)
+        conn.commit()
+    finally:
+        conn.close()
+    return updated
+
+
+def write_air_quality_index(cursor, full=False):
+    """
+    Aktualizuje tabelę air_quality_index dla wszystkich stacji przy użyciu podanego kursora
+    (bez zatwierdzania transakcji, więc można ją wykonać w wątku zapisującym IngestWriter).
+
+    Działanie funkcji:
+    1. Odczytuje ID ostatniego przetworzonego pomiaru z tabeli air_quality_index_state.
+    2. Wyznacza pary (stacja, godzina), w których pojawiły się nowe pomiary
+       (przy full=True przeliczane są wszystkie godziny).
+    3. Jednym zapytaniem pobiera średnie godzinowe wartości PM10, PM2.5, NO2, SO2 i O3 dla tych par;
+       zapytanie jest ograniczone do czujników zmienionych stacji i okna dat nowych pomiarów,
+       więc jego koszt zależy od ilości nowych danych, a nie od rozmiaru tabeli.
+    4. Wektorowo wylicza indeksy cząstkowe i indeks ogólny (najgorszy z cząstkowych).
+    5. Zapisuje wyniki do bazy i zapamiętuje ID ostatniego pomiaru.
+
+    Zwraca liczbę przeliczonych par (stacja, godzina).
+    """
+    cursor.execute("SELECT last_measurement_id FROM air_quality_index_state WHERE id = 1")
+    row = cursor.fetchone()
+    last_id = 0 if full or row is None else row[0]
+
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM measurements")
+    max_id = cursor.fetchone()[0]
+    if max_id <= last_id:
+        return 0
+
+    touched = None
+    conditions, params = "", []
+    if last_id > 0:
+        touched, conditions, params = _touched_hours(cursor, last_id, max_id)
+
+    rows = []
+    if touched is None or touched:
+        placeholders = ", ".join("?" for _ in POLLUTANTS)
+        cursor.execute(f"""
+            SELECT s.station_id, substr(m.date, 1, 13) || ':00' AS hour, m.param_key, AVG(m.value)
+            FROM measurements m
+            JOIN sensors s ON s.id_sensor = m.sensor_id
+            WHERE m.value IS NOT NULL
+              AND m.param_key IN ({placeholders})
+              {conditions}
+            GROUP BY s.station_id, hour, m.param_key
+        """, (*POLLUTANTS, *params))
+        rows = cursor.fetchall()
+    if touched is not None:
+        # Okno dat może obejmować godziny bez nowych pomiarów - zostają tylko zmienione pary
+        rows = [r for r in rows if (r[0], r[1][:13]) in touched]
+
+    keys = {}
+    if rows:
+        # Numer wiersza wyniku dla każdej pary (stacja, godzina)
+        row_idx = np.fromiter(
+            (keys.setdefault((r[0], r[1]), len(keys)) for r in rows), dtype=int, count=len(rows)
+        )
+        param_keys = np.array([r[2] for r in rows])
+        values = np.fromiter((r[3] for r in rows), dtype=float, count=len(rows))
+        col_idx = np.fromiter((POLLUTANTS.index(r[2]) for r in rows), dtype=int, count=len(rows))
+
+        # Macierz (stacja-godzina) x zanieczyszczenie; indeks ogólny to najgorszy indeks cząstkowy
+        matrix = np.full((len(keys), len(POLLUTANTS)), NO_INDEX, dtype=int)
+        matrix[row_idx, col_idx] = compute_all_sub_indices(param_keys, values)
+        overall = matrix.max(axis=1)
+
+        cursor.executemany("""
+            INSERT OR REPLACE INTO air_quality_index
+                (station_id, hour, pm10, pm25, no2, so2, o3, index_level)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            (station_id, hour, *[None if v == NO_INDEX else int(v) for v in matrix[i]], int(overall[i]))
+            for (station_id, hour), i in keys.items()
+        ))
+
+    cursor.execute("""
+        INSERT OR REPLACE INTO air_quality_index_state (id, last_measurement_id)
+        VALUES (1, ?)
+    """, (max_id,))
+
+    return len(keys)
+
+
+def get_latest_indices():
+    """
+    Zwraca listę najnowszych indeksów jakości powietrza dla wszystkich stacji.
+    Każdy element to słownik z nazwą stacji, miastem, godziną, indeksami cząstkowymi i indeksem ogólnym.
+    """
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT a.station_id, st.name, st.city, a.hour, a.pm10, a.pm25, a.no2, a.so2, a.o3, a.index_level
+        FROM air_quality_index a
+        JOIN (
+            SELECT station_id, MAX(hour) AS hour FROM air_quality_index GROUP BY station_id
+        ) latest ON latest.station_id = a.station_id AND latest.hour = a.hour
+        LEFT JOIN stations st ON st.id_stacji = a.station_id
+        ORDER BY st.city, st.name
+    """)
+    rows = cursor.fetchall()
+    conn.close()
+
+    return [
+        {
+            "station_id": r[0],
+            "station_name": r[1] or "",
+            "city": r[2] or "",
+            "hour": r[3],
+            "sub_indices": dict(zip(POLLUTANTS, r[4:9])),
+            "index_level": r[9],
+            "index_name": INDEX_LEVELS[r[9]] if r[9] is not None and r[9] >= 0 else "Brak indeksu",
+        }
+        for r in rows
+    ]
@@ -0,0 +1,188 @@
+import json
+from bisect import insort
+from datetime import datetime
+
+# Parametry detektora anomalii
+SPIKE_SIGMA = 4.0           # skok: odchylenie od średniej większe niż SPIKE_SIGMA odchyleń standardowych
+SPIKE_MIN_SAMPLES = 24      # detekcja skoków dopiero po zebraniu tylu pomiarów
+FLATLINE_RUN = 6            # "płaska linia": tyle identycznych wartości pod rząd
+DROPOUT_HOURS = 3           # przerwa: brak wartości pomiarów dłużej niż tyle godzin
+
+QUANTILES = (0.5, 0.95)
+
+
+class P2Quantile:
+    """
+    Przybliżony kwantyl liczony strumieniowo algorytmem P² (Jain, Chlamtac).
+    Przechowuje tylko pięć znaczników niezależnie od liczby pomiarów.
+    """
+
+    def __init__(self, p, state=None):
+        self.p = p
+        if state:
+            self.heights = state["heights"]
+            self.positions = state["positions"]
+            self.desired = state["desired"]
+        else:
+            self.heights = []
+            self.positions = [1, 2, 3, 4, 5]
+            self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        q = self.heights
+        if len(q) < 5:
+            insort(q, x)
+            return
+
+        n = self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(1, 5) if x < q[i]) - 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Korekta trzech środkowych znaczników
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if q[i - 1] < candidate < q[i + 1]:
+                    q[i] = candidate
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    def value(self):
+        if not self.heights:
+            return None
+        if len(self.heights) < 5:
+            return self.heights[round(self.p * (len(self.heights) - 1))]
+        return self.heights[2]
+
+    def state(self):
+        return {"heights": self.heights, "positions": self.positions, "desired": self.desired}
+
+
+class SensorAccumulator:
+    """
+    Bieżące statystyki jednego czujnika aktualizowane w czasie O(1) na pomiar:
+    liczba pomiarów, średnia i wariancja (algorytm Welforda), minimum, maksimum
+    oraz przybliżone kwantyle. Przy każdej aktualizacji sprawdzane są anomalie.
+
+    Pomiary bez wartości (None) nie zmieniają statystyk ani daty ostatniego pomiaru - API
+    zwraca None także dla godzin jeszcze niezaraportowanych, których wartości mogą przyjść
+    później. Są tylko liczone jako bieżąca seria braków (missing_run), a przerwa jest
+    zgłaszana na podstawie odstępu czasu, gdy wartości wrócą.
+    """
+
+    def __init__(self, sensor_id):
+        self.sensor_id = sensor_id
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.quantiles = {p: P2Quantile(p) for p in QUANTILES}
+        self.last_date = None
+        self.last_value = None
+        self.flat_run = 0
+        self.missing_run = 0
+        self.missing_date = None
+
+    @property
+    def std(self):
+        return (self.m2 / self.count) ** 0.5 if self.count else 0.0
+
+    def update(self, date, value):
+        """
+        Dodaje pomiar (data w formacie ISO, wartość lub None) i zwraca listę wykrytych anomalii
+        jako krotki (rodzaj, opis). Rodzaje: "spike", "flatline", "dropout".
+        """
+        if value is None:
+            # Godziny bez wartości ponownie pobrane z API nie są liczone drugi raz
+            if self.missing_date is None or date > self.missing_date:
+                self.missing_run += 1
+                self.missing_date = date
+            return []
+
+        anomalies = []
+
+        if self.last_date is not None:
+            gap = (datetime.fromisoformat(date) - datetime.fromisoformat(self.last_date)).total_seconds() / 3600
+            if gap > DROPOUT_HOURS:
+                anomalies.append(("dropout", f"Brak pomiarów przez {gap:.0f} h od {self.last_date}"))
+
+        if self.count >= SPIKE_MIN_SAMPLES and self.std > 0:
+            z_score = (value - self.mean) / self.std
+            if abs(z_score) > SPIKE_SIGMA:
+                anomalies.append(("spike", f"Odchylenie {z_score:+.1f} sigma od średniej {self.mean:.2f}"))
+
+        self.flat_run = self.flat_run + 1 if value == self.last_value else 1
+        if self.flat_run == FLATLINE_RUN:
+            anomalies.append(("flatline", f"Wartość {value} powtórzona {FLATLINE_RUN} razy z rzędu"))
+
+        # Algorytm Welforda
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for sketch in self.quantiles.values():
+            sketch.add(value)
+
+        self.last_date = date
+        self.last_value = value
+        self.missing_run = 0
+        self.missing_date = None
+        return anomalies
+
+    def stats(self):
+        """
+        Zwraca słownik z bieżącymi statystykami czujnika.
+        """
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 2),
+            "std": round(self.std, 2),
+            "min": self.min,
+            "max": self.max,
+            "median": self.quantiles[0.5].value(),
+            "p95": self.quantiles[0.95].value(),
+            "last_date": self.last_date,
+            "missing_run": self.missing_run,
+        }
+
+    def to_row(self):
+        """
+        Zwraca krotkę do zapisu w tabeli sensor_stats.
+        """
+        sketch = json.dumps({str(p): q.state() for p, q in self.quantiles.items()})
+        return (
+            self.sensor_id, self.count, self.mean, self.m2, self.min, self.max,
+            sketch, self.last_date, self.last_value, self.flat_run, self.missing_run, self.missing_date
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Odtwarza akumulator z wiersza tabeli sensor_stats (kolejność kolumn jak w to_row).
+        """
+        acc = cls(row[0])
+        acc.count, acc.mean, acc.m2, acc.min, acc.max = row[1:6]
+        acc.quantiles = {float(p): P2Quantile(float(p), state) for p, state in json.loads(row[6]).items()}
+        acc.last_date, acc.last_value, acc.flat_run, acc.missing_run, acc.missing_date = row[7:12]
+        return acc
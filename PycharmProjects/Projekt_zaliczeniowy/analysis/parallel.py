@@ -0,0 +1,267 @@
+import argparse
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import db.database as database
+from db.database import create_connection
+
+# Poniżej tej liczby pomiarów uruchamianie puli procesów kosztuje więcej niż samo liczenie
+MIN_PARALLEL_ROWS = 200_000
+
+# Początek osi czasu (julianday('2000-01-01')) wspólny dla wszystkich czujników, żeby agregaty
+# różnych czujników dało się łączyć; ogranicza też błędy zaokrągleń przy liczeniu trendu
+TIME_ORIGIN = 2451544.5
+
+
+def plan_segments(sensor_ids=None):
+    """
+    Rezerwuje miejsce na szeregi czujników we wspólnym buforze.
+
+    Zwraca listę (sensor_id, start, capacity), gdzie capacity to liczba różnych dat pomiarów
+    czujnika (górne ograniczenie długości szeregu). Zapytanie czyta tylko indeks (sensor_id, date),
+    bez wierszy tabeli measurements.
+    """
+    conn = create_connection()
+    query = "SELECT sensor_id, COUNT(DISTINCT date) FROM measurements"
+    params = []
+    if sensor_ids is not None:
+        params = list(sensor_ids)
+        query += f" WHERE sensor_id IN ({', '.join('?' for _ in params)})"
+    rows = conn.execute(query + " GROUP BY sensor_id ORDER BY sensor_id", params).fetchall()
+    conn.close()
+
+    segments = []
+    start = 0
+    for sensor_id, capacity in rows:
+        segments.append((sensor_id, start, capacity))
+        start += capacity
+    return segments
+
+
+def read_series(conn, sensor_id, out):
+    """
+    Wczytuje szereg czujnika (czas w dniach od TIME_ORIGIN, wartość) do tablicy out o kształcie (2, capacity).
+    Pomiary zapisane wielokrotnie (kolejne pobrania z API) są uśredniane do jednej wartości na datę,
+    a daty bez wartości pomijane. Zwraca długość wczytanego szeregu.
+    """
+    cursor = conn.execute("""
+        SELECT julianday(date), AVG(value) FROM measurements
+        WHERE sensor_id = ?
+        GROUP BY date
+        HAVING AVG(value) IS NOT NULL
+        ORDER BY date
+    """, (sensor_id,))
+    count = 0
+    while True:
+        rows = cursor.fetchmany(10000)
+        if not rows:
+            break
+        chunk = np.array(rows, dtype=np.float64)
+        out[:, count:count + len(rows)] = chunk.T
+        count += len(rows)
+    out[0, :count] -= TIME_ORIGIN
+    return count
+
+
+def summarize_segment(times, values):
+    """
+    Wylicza częściowe agregaty dla jednego fragmentu szeregu czasowego.
+    Agregaty można później łączyć funkcją merge_partials bez dostępu do surowych danych.
+    """
+    count = len(values)
+    mean = values.mean()
+    t_mean = times.mean()
+    dt = times - t_mean
+    dv = values - mean
+    return {
+        "count": count,
+        "mean": float(mean),
+        "m2": float(dv @ dv),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "t_mean": float(t_mean),
+        "t_m2": float(dt @ dt),
+        "tv_c": float(dt @ dv),
+    }
+
+
+def merge_partials(a, b):
+    """
+    Łączy dwa zestawy częściowych agregatów (metoda Chana dla średniej, wariancji i kowariancji).
+    """
+    if a is None:
+        return b
+    if b is None:
+        return a
+
+    count = a["count"] + b["count"]
+    delta = b["mean"] - a["mean"]
+    t_delta = b["t_mean"] - a["t_mean"]
+    weight = a["count"] * b["count"] / count
+    return {
+        "count": count,
+        "mean": a["mean"] + delta * b["count"] / count,
+        "m2": a["m2"] + b["m2"] + delta * delta * weight,
+        "min": min(a["min"], b["min"]),
+        "max": max(a["max"], b["max"]),
+        "t_mean": a["t_mean"] + t_delta * b["count"] / count,
+        "t_m2": a["t_m2"] + b["t_m2"] + t_delta * t_delta * weight,
+        "tv_c": a["tv_c"] + b["tv_c"] + t_delta * delta * weight,
+    }
+
+
+def finalize(partial):
+    """
+    Zamienia częściowe agregaty na statystyki końcowe:
+    liczba pomiarów, średnia, odchylenie standardowe, minimum, maksimum
+    oraz trend (nachylenie prostej regresji w jednostkach na dzień).
+    """
+    count = partial["count"]
+    return {
+        "count": count,
+        "mean": round(partial["mean"], 4),
+        "std": round((partial["m2"] / count) ** 0.5, 4),
+        "min": partial["min"],
+        "max": partial["max"],
+        "trend_per_day": round(partial["tv_c"] / partial["t_m2"], 4) if partial["t_m2"] > 0 else 0.0,
+    }
+
+
+def _load_and_summarize(db_path, data, segments):
+    """
+    Wczytuje szeregi przydzielonych czujników (przez własne połączenie tylko do odczytu)
+    do ich fragmentów bufora data i liczy dla nich częściowe agregaty.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        result = []
+        for sensor_id, start, capacity in segments:
+            count = read_series(conn, sensor_id, data[:, start:start + capacity])
+            if count:
+                result.append((sensor_id, summarize_segment(data[0, start:start + count], data[1, start:start + count])))
+        return result
+    finally:
+        conn.close()
+
+
+def _summarize_shared(db_path, shm_name, size, segments):
+    """
+    Funkcja wykonywana w procesie roboczym. Podłącza się do bloku pamięci współdzielonej
+    i wczytuje do niego szeregi swoich czujników - odczyt z bazy i obliczenia
+    odbywają się równolegle we wszystkich procesach.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    data = np.ndarray((2, size), dtype=np.float64, buffer=shm.buf)
+    try:
+        return _load_and_summarize(db_path, data, segments)
+    finally:
+        del data
+        shm.close()
+
+
+def _split_segments(segments, parts):
+    """
+    Dzieli czujniki na zadania o zbliżonej liczbie pomiarów (najdłuższe szeregi rozdzielane są najpierw).
+    """
+    chunks = [[] for _ in range(parts)]
+    sizes = [0] * parts
+    for segment in sorted(segments, key=lambda s: s[2], reverse=True):
+        smallest = sizes.index(min(sizes))
+        chunks[smallest].append(segment)
+        sizes[smallest] += segment[2]
+    return [chunk for chunk in chunks if chunk]
+
+
+def compute_sensor_partials(sensor_ids=None, workers=None):
+    """
+    Liczy częściowe agregaty dla każdego czujnika, rozdzielając pracę na pulę procesów.
+
+    Proces główny tylko rezerwuje w pamięci współdzielonej miejsce na szereg każdego czujnika;
+    procesy robocze same wczytują z bazy szeregi swoich czujników do przydzielonych fragmentów
+    bufora i liczą agregaty, więc równolegle wykonywany jest także odczyt danych.
+    Dla małych zbiorów danych lub workers=1 obliczenia wykonywane są w bieżącym procesie.
+    """
+    segments = plan_segments(sensor_ids)
+    size = sum(capacity for _, _, capacity in segments)
+    if not size:
+        return {}
+
+    db_path = database.DB_PATH
+    if workers is None:
+        workers = 1 if size < MIN_PARALLEL_ROWS else os.cpu_count() or 1
+    if workers == 1:
+        data = np.empty((2, size), dtype=np.float64)
+        return dict(_load_and_summarize(db_path, data, segments))
+
+    shm = shared_memory.SharedMemory(create=True, size=2 * size * np.dtype(np.float64).itemsize)
+    try:
+        partials = {}
+        chunks = _split_segments(segments, workers * 4)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_summarize_shared, db_path, shm.name, size, chunk) for chunk in chunks]
+            for future in futures:
+                for sensor_id, partial in future.result():
+                    partials[sensor_id] = merge_partials(partials.get(sensor_id), partial)
+        return partials
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def sensor_summaries(sensor_ids=None, workers=None):
+    """
+    Zwraca słownik {sensor_id: statystyki} dla wszystkich (lub wybranych) czujników w bazie.
+    """
+    partials = compute_sensor_partials(sensor_ids, workers)
+    return {sensor_id: finalize(partial) for sensor_id, partial in partials.items()}
+
+
+def station_summaries(workers=None):
+    """
+    Zwraca słownik {(station_id, param_key): statystyki}, łącząc agregaty
+    czujników tej samej stacji mierzących ten sam parametr.
+    """
+    partials = compute_sensor_partials(workers=workers)
+
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id_sensor, station_id, param_code FROM sensors")
+    sensor_keys = {sensor_id: (station_id, param_key) for sensor_id, station_id, param_key in cursor.fetchall()}
+    conn.close()
+
+    merged = {}
+    for sensor_id, partial in partials.items():
+        key = sensor_keys.get(sensor_id)
+        if key is not None:
+            merged[key] = merge_partials(merged.get(key), partial)
+
+    return {key: finalize(partial) for key, partial in merged.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Statystyki i trendy pomiarów liczone równolegle dla czujników lub stacji.")
+    parser.add_argument("--stations", action="store_true", help="Łączy czujniki tej samej stacji i parametru")
+    parser.add_argument("--sensor", type=int, action="append", help="ID czujnika (można podać wielokrotnie)")
+    parser.add_argument("--workers", type=int, help="Liczba procesów (domyślnie liczba rdzeni dla dużych zbiorów)")
+    args = parser.parse_args(argv)
+
+    if args.stations:
+        summaries = station_summaries(args.workers)
+        labels = {key: f"Stacja {key[0]} ({key[1]})" for key in summaries}
+    else:
+        summaries = sensor_summaries(args.sensor, args.workers)
+        labels = {key: f"Czujnik {key}" for key in summaries}
+
+    for key in sorted(summaries):
+        s = summaries[key]
+        print(
+            f"{labels[key]}: pomiarów {s['count']}, średnia {s['mean']}, odchylenie {s['std']}, "
+            f"min {s['min']}, max {s['max']}, trend {s['trend_per_day']} na dzień"
+        )
+
+
+if __name__ == "__main__":
+    main()
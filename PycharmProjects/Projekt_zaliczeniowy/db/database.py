@@ -1,5 +1,8 @@
 import os
 import sqlite3
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from analysis.online_stats import SensorAccumulator
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, "air_quality.db")
@@ -29,19 +32,29 @@ def insert_station(station):
     '''Funkcja zapisuje dane stacji'''
     conn = create_connection()
     cursor = conn.cursor()
-    cursor.execute("""
-        INSERT OR REPLACE INTO stations (id_stacji, name, lat, lon, city, street)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (
+    write_stations(cursor, [station_row(station)])
+    conn.commit()
+    conn.close()
+
+
+def station_row(station):
+    '''Zamienia dane stacji z API na krotkę kolumn tabeli stations (KeyError przy niekompletnych danych)'''
+    return (
         station['id'],
         station['stationName'],
         station['gegrLat'],
         station['gegrLon'],
         station.get('city', {}).get('name', ''),
         station.get('addressStreet', '')
-    ))
-    conn.commit()
-    conn.close()
+    )
+
+
+def write_stations(cursor, rows):
+    '''Zapisuje stacje (krotki z station_row) przy użyciu podanego kursora (bez zatwierdzania transakcji)'''
+    cursor.executemany("""
+        INSERT OR REPLACE INTO stations (id_stacji, name, lat, lon, city, street)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
 
 
 def create_measurements_table():
@@ -57,6 +70,72 @@ def create_measurements_table():
             param_key TEXT
         );
     """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_measurements_sensor_date ON measurements (sensor_id, date);")
+
+    # Tabela statystyk bez kolumn serii pomiarów bez wartości jest budowana od nowa
+    cursor.execute("PRAGMA table_info(sensor_stats)")
+    columns = [r[1] for r in cursor.fetchall()]
+    if columns and "missing_run" not in columns:
+        cursor.execute("DROP TABLE sensor_stats")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sensor_stats (
+            sensor_id INTEGER PRIMARY KEY,
+            count INTEGER,
+            mean REAL,
+            m2 REAL,
+            min REAL,
+            max REAL,
+            sketch TEXT,
+            last_date TEXT,
+            last_value REAL,
+            flat_run INTEGER,
+            missing_run INTEGER,
+            missing_date TEXT
+        );
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS anomalies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sensor_id INTEGER,
+            date TEXT,
+            kind TEXT,
+            value REAL,
+            details TEXT
+        );
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sensor_days (
+            sensor_id INTEGER,
+            year INTEGER,
+            days BLOB,
+            PRIMARY KEY (sensor_id, year)
+        );
+    """)
+
+    # Baza z wcześniejszej wersji programu: mapa dni budowana jednorazowo z zapisanych pomiarów
+    cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM sensor_days) AND EXISTS (SELECT 1 FROM measurements)")
+    if cursor.fetchone()[0]:
+        cursor.execute("SELECT DISTINCT sensor_id, substr(date, 1, 10) FROM measurements WHERE value IS NOT NULL")
+        days_by_sensor = {}
+        for sensor_id, day in cursor.fetchall():
+            days_by_sensor.setdefault(sensor_id, []).append((day, 0))
+        for sensor_id, days in days_by_sensor.items():
+            update_sensor_days(cursor, sensor_id, days)
+
+    # Statystyki bieżące i anomalie budowane jednorazowo z zapisanych pomiarów, czujnik po czujniku
+    cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM sensor_stats) AND EXISTS (SELECT 1 FROM measurements)")
+    if cursor.fetchone()[0]:
+        cursor.execute("DELETE FROM anomalies")
+        stats_cursor = conn.cursor()
+        # Kolejność zgodna z indeksem (sensor_id, date); powtórzone zapisy tej samej daty są uśredniane
+        cursor.execute("""
+            SELECT sensor_id, date, AVG(value) FROM measurements
+            GROUP BY sensor_id, date ORDER BY sensor_id, date
+        """)
+        for sensor_id, rows in groupby(cursor, key=lambda r: r[0]):
+            update_sensor_stats(stats_cursor, sensor_id, [(r[1], r[2]) for r in rows])
+
     conn.commit()
     conn.close()
 
@@ -65,20 +144,164 @@ def insert_measurements(sensor_id, param_key, measurements):
     '''Funkcja zapisuje dane z sensora'''
     conn = create_connection()
     cursor = conn.cursor()
+    write_measurements(cursor, sensor_id, param_key, [measurement_row(m) for m in measurements])
+    conn.commit()
+    conn.close()
+
+
+def measurement_row(measurement):
+    '''
+    Zamienia pomiar z API na krotkę (data, wartość).
+    Rzuca KeyError przy niekompletnych danych i ValueError przy niepoprawnej dacie lub wartości.
+    '''
+    date_str, value = measurement['date'], measurement['value']
+    datetime.fromisoformat(date_str)
+    return date_str, None if value is None else float(value)
+
+
+def write_measurements(cursor, sensor_id, param_key, rows):
+    '''
+    Zapisuje pomiary czujnika (krotki z measurement_row) przy użyciu podanego kursora
+    (bez zatwierdzania transakcji) i aktualizuje statystyki bieżące czujnika.
+    Zwraca listę wykrytych anomalii.
+    '''
+    cursor.executemany("""
+        INSERT INTO measurements (sensor_id, date, value, param_key)
+        VALUES (?, ?, ?, ?)
+    """, [(sensor_id, day, value, param_key) for day, value in rows])
+    update_sensor_days(cursor, sensor_id, rows)
+    return update_sensor_stats(cursor, sensor_id, rows)
+
+
+DAYS_BITMAP_SIZE = 46   # 366 dni roku po jednym bicie
 
-    for m in measurements:
+
+def update_sensor_days(cursor, sensor_id, measurements):
+    '''
+    Zaznacza w mapie bitowej czujnika dni, dla których zapisano pomiary (krotki (data, wartość)) z wartością.
+    Dla każdego roku przechowywany jest jeden wiersz z 46-bajtową mapą (bit = dzień roku).
+    '''
+    days_by_year = {}
+    for date_str, value in measurements:
+        if value is None:
+            continue
+        day = date.fromisoformat(date_str[:10])
+        days_by_year.setdefault(day.year, set()).add(day.timetuple().tm_yday - 1)
+
+    for year, days in days_by_year.items():
+        cursor.execute("SELECT days FROM sensor_days WHERE sensor_id = ? AND year = ?", (sensor_id, year))
+        row = cursor.fetchone()
+        bitmap = bytearray(row[0] if row else DAYS_BITMAP_SIZE)
+        for day in days:
+            bitmap[day // 8] |= 1 << (day % 8)
         cursor.execute("""
-            INSERT INTO measurements (sensor_id, date, value, param_key)
-            VALUES (?, ?, ?, ?)
-        """, (
-            sensor_id,
-            m['date'],
-            m['value'],
-            param_key
-        ))
+            INSERT OR REPLACE INTO sensor_days (sensor_id, year, days)
+            VALUES (?, ?, ?)
+        """, (sensor_id, year, bytes(bitmap)))
 
-    conn.commit()
+
+def get_sensor_days(sensor_id):
+    '''Funkcja zwraca słownik {rok: mapa bitowa dni z pomiarami} dla czujnika'''
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT year, days FROM sensor_days WHERE sensor_id = ? ORDER BY year", (sensor_id,))
+    rows = cursor.fetchall()
+    conn.close()
+    return dict(rows)
+
+
+def get_measurements(sensor_id, date_from=None, date_to=None):
+    '''
+    Funkcja zwraca listę pomiarów (data, wartość) czujnika zapisanych w bazie w zakresie dni YYYY-MM-DD.
+    Pomiary zapisane wielokrotnie (kolejne pobrania z API) są uśredniane do jednej wartości na datę.
+    '''
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT date, AVG(value) FROM measurements
+        WHERE sensor_id = ? AND value IS NOT NULL
+          AND (? IS NULL OR date >= ?)
+          AND (? IS NULL OR date <= ? || '~')
+        GROUP BY date
+        ORDER BY date
+    """, (sensor_id, date_from, date_from, date_to, date_to))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def days_from_bitmap(year, bitmap, month=None):
+    '''Zwraca posortowaną listę dni (datetime.date) zaznaczonych w mapie bitowej roku, opcjonalnie z jednego miesiąca'''
+    first = date(year, 1, 1)
+    days = [
+        first + timedelta(days=i * 8 + bit)
+        for i, byte in enumerate(bitmap) if byte
+        for bit in range(8) if byte & (1 << bit)
+    ]
+    return [d for d in days if d.year == year and (month is None or d.month == month)]
+
+
+def update_sensor_stats(cursor, sensor_id, measurements):
+    '''
+    Aktualizuje zapisane statystyki bieżące czujnika o nowe pomiary (krotki (data, wartość))
+    i zapisuje wykryte anomalie.
+    Uwzględniane są tylko pomiary z datą późniejszą niż ostatni pomiar z wartością, więc ponowny
+    zapis tych samych danych z API nie zmienia statystyk, a godziny pobrane wcześniej bez wartości
+    są uwzględniane, gdy wartości zostaną uzupełnione.
+    '''
+    cursor.execute("SELECT * FROM sensor_stats WHERE sensor_id = ?", (sensor_id,))
+    row = cursor.fetchone()
+    acc = SensorAccumulator.from_row(row) if row else SensorAccumulator(sensor_id)
+
+    last_date = acc.last_date
+    new_values = sorted(
+        (m for m in measurements if last_date is None or m[0] > last_date),
+        key=lambda m: m[0]
+    )
+    if not new_values:
+        return []
+
+    anomalies = []
+    for date, value in new_values:
+        for kind, details in acc.update(date, value):
+            anomalies.append((sensor_id, date, kind, value, details))
+
+    cursor.execute("""
+        INSERT OR REPLACE INTO sensor_stats
+            (sensor_id, count, mean, m2, min, max, sketch, last_date, last_value, flat_run, missing_run, missing_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, acc.to_row())
+    cursor.executemany("""
+        INSERT INTO anomalies (sensor_id, date, kind, value, details)
+        VALUES (?, ?, ?, ?, ?)
+    """, anomalies)
+    return anomalies
+
+
+def get_sensor_stats(sensor_id):
+    '''Funkcja zwraca bieżące statystyki czujnika lub None, jeśli nie ma jeszcze pomiarów'''
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM sensor_stats WHERE sensor_id = ?", (sensor_id,))
+    row = cursor.fetchone()
     conn.close()
+    return SensorAccumulator.from_row(row).stats() if row else None
+
+
+def get_anomalies(sensor_id, date_from=None, date_to=None):
+    '''Funkcja zwraca listę anomalii (data, rodzaj, wartość, opis) wykrytych dla czujnika w zakresie dni YYYY-MM-DD'''
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT date, kind, value, details FROM anomalies
+        WHERE sensor_id = ?
+          AND (? IS NULL OR substr(date, 1, 10) >= ?)
+          AND (? IS NULL OR substr(date, 1, 10) <= ?)
+        ORDER BY date
+    """, (sensor_id, date_from, date_from, date_to, date_to))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
 
 
 def create_sensors_table():
@@ -104,28 +327,107 @@ def insert_sensor(sensor):
     '''Funkcja zapisuje dane czujnika do bazy danych'''
     conn = create_connection()
     cursor = conn.cursor()
-    cursor.execute("""
-        INSERT OR REPLACE INTO sensors (id_sensor, station_id, param_name, param_formula, param_code, param_id)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (
+    write_sensors(cursor, [sensor_row(sensor)])
+    conn.commit()
+    conn.close()
+
+
+def sensor_row(sensor):
+    '''Zamienia dane czujnika z API na krotkę kolumn tabeli sensors (KeyError przy niekompletnych danych)'''
+    return (
         sensor['id'],
         sensor['stationId'],
         sensor['param']['paramName'],
         sensor['param']['paramFormula'],
         sensor['param']['paramCode'],
         sensor['param']['idParam']
-    ))
+    )
+
+
+def write_sensors(cursor, rows):
+    '''Zapisuje czujniki (krotki z sensor_row) przy użyciu podanego kursora (bez zatwierdzania transakcji)'''
+    cursor.executemany("""
+        INSERT OR REPLACE INTO sensors (id_sensor, station_id, param_name, param_formula, param_code, param_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+
+
+def get_cities():
+    '''Funkcja zwraca posortowaną listę miast, w których są zapisane stacje'''
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT city FROM stations WHERE city != '' ORDER BY city")
+    cities = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return cities
+
+
+def get_stations_by_city(city):
+    '''Funkcja zwraca stacje zapisane w bazie dla miasta, w tym samym formacie co API GIOŚ'''
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id_stacji, name, lat, lon, city, street FROM stations ORDER BY name")
+    # Porównanie w Pythonie - lower() w SQLite nie obsługuje polskich znaków
+    rows = [r for r in cursor.fetchall() if (r[4] or '').lower() == city.lower()]
+    conn.close()
+    return [
+        {
+            'id': r[0],
+            'stationName': r[1],
+            'gegrLat': r[2],
+            'gegrLon': r[3],
+            'city': {'name': r[4]},
+            'addressStreet': r[5]
+        }
+        for r in rows
+    ]
+
+
+def create_air_index_table():
+    '''Funkcja tworząca tabelę z wyliczonym indeksem jakości powietrza (cache na stację i godzinę)'''
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS air_quality_index (
+            station_id INTEGER,
+            hour TEXT,
+            pm10 INTEGER,
+            pm25 INTEGER,
+            no2 INTEGER,
+            so2 INTEGER,
+            o3 INTEGER,
+            index_level INTEGER,
+            PRIMARY KEY (station_id, hour)
+        );
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS air_quality_index_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_measurement_id INTEGER
+        );
+    """)
     conn.commit()
     conn.close()
 
+
+def clear_tables(cursor):
+    '''Usuwa wszystkie dane z bazy przy użyciu podanego kursora (bez zatwierdzania transakcji)'''
+    cursor.execute("DELETE FROM measurements;")
+    cursor.execute("DELETE FROM sensors;")
+    cursor.execute("DELETE FROM stations;")
+    cursor.execute("DELETE FROM sensor_stats;")
+    cursor.execute("DELETE FROM anomalies;")
+    cursor.execute("DELETE FROM sensor_days;")
+    cursor.execute("DELETE FROM air_quality_index;")
+    cursor.execute("DELETE FROM air_quality_index_state;")
+
+
 def clear_database():
-    conn = sqlite3.connect("air_quality.db")
+    conn = create_connection()
     cursor = conn.cursor()
 
     try:
-        cursor.execute("DELETE FROM measurements;")
-        cursor.execute("DELETE FROM sensors;")
-        cursor.execute("DELETE FROM stations;")
+        clear_tables(cursor)
         conn.commit()
     except Exception as e:
         conn.rollback()
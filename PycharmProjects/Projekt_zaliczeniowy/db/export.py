@@ -0,0 +1,198 @@
+import argparse
+import csv
+import gzip
+import json
+from db.database import create_connection
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+COLUMNS = ["sensor_id", "station_id", "param_key", "date", "value"]
+FORMATS = ("csv", "jsonl", "parquet")
+CHUNK_SIZE = 5000
+
+
+class ExportError(Exception):
+    """Wyjątek podnoszony, gdy eksport danych nie może zostać wykonany."""
+    pass
+
+
+def iter_measurement_chunks(sensor_id=None, station_id=None, param_key=None,
+                            date_from=None, date_to=None, chunk_size=CHUNK_SIZE):
+    """
+    Generator zwracający pomiary z bazy w paczkach po chunk_size wierszy (cursor.fetchmany),
+    dzięki czemu w pamięci nigdy nie znajduje się cała tabela measurements.
+
+    Filtry są opcjonalne; daty podaje się w formacie YYYY-MM-DD (zakres obustronnie domknięty).
+    Każdy wiersz to krotka w kolejności COLUMNS.
+
+    Przy filtrze czujnika lub stacji pomiary są czytane indeksem (sensor_id, date) w jego kolejności,
+    a bez nich cała tabela jest przeglądana w kolejności zapisu (id) - w obu przypadkach
+    bez sortowania wyniku w pamięci.
+    """
+    conditions = []
+    params = []
+    if sensor_id is not None:
+        conditions.append("m.sensor_id = ?")
+        params.append(sensor_id)
+    if station_id is not None:
+        # Warunek na sensor_id (a nie s.station_id) pozwala czytać pomiary stacji indeksem
+        conditions.append("m.sensor_id IN (SELECT id_sensor FROM sensors WHERE station_id = ?)")
+        params.append(station_id)
+    if param_key is not None:
+        conditions.append("m.param_key = ?")
+        params.append(param_key)
+    if date_from is not None:
+        conditions.append("m.date >= ?")
+        params.append(date_from)
+    if date_to is not None:
+        # Daty w bazie mają postać "YYYY-MM-DD HH:MM:SS", więc "~" sortuje się po każdej godzinie dnia
+        conditions.append("m.date <= ?")
+        params.append(date_to + "~")
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    order = "m.sensor_id, m.date" if sensor_id is not None or station_id is not None else "m.id"
+
+    conn = create_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT m.sensor_id, s.station_id, m.param_key, m.date, m.value
+            FROM measurements m
+            LEFT JOIN sensors s ON s.id_sensor = m.sensor_id
+            {where}
+            ORDER BY {order}
+        """, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _open_text(path, compress):
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def _write_csv(path, chunks, compress):
+    count = 0
+    with _open_text(path, compress) as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for rows in chunks:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def _write_jsonl(path, chunks, compress):
+    count = 0
+    with _open_text(path, compress) as f:
+        for rows in chunks:
+            f.writelines(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n" for row in rows)
+            count += len(rows)
+    return count
+
+
+def _write_parquet(path, chunks, compress):
+    if pq is None:
+        raise ExportError("Eksport do formatu Parquet wymaga biblioteki pyarrow (pip install pyarrow).")
+
+    schema = pa.schema([
+        ("sensor_id", pa.int64()),
+        ("station_id", pa.int64()),
+        ("param_key", pa.string()),
+        ("date", pa.string()),
+        ("value", pa.float64()),
+    ])
+    count = 0
+    # Każda paczka wierszy trafia do pliku jako osobna grupa wierszy (row group)
+    with pq.ParquetWriter(path, schema, compression="gzip" if compress else "snappy") as writer:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            ))
+            count += len(rows)
+    return count
+
+
+WRITERS = {
+    "csv": _write_csv,
+    "jsonl": _write_jsonl,
+    "parquet": _write_parquet,
+}
+
+
+def detect_format(path):
+    """
+    Rozpoznaje format eksportu na podstawie rozszerzenia pliku (z pominięciem końcówki .gz).
+    """
+    name = path.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    for fmt, extensions in (("csv", (".csv",)), ("jsonl", (".jsonl", ".ndjson")), ("parquet", (".parquet",))):
+        if name.endswith(extensions):
+            return fmt
+    raise ExportError(f"Nie rozpoznano formatu eksportu dla pliku: {path}")
+
+
+def export_measurements(path, fmt=None, compress=None, sensor_id=None, station_id=None,
+                        param_key=None, date_from=None, date_to=None, chunk_size=CHUNK_SIZE):
+    """
+    Eksportuje pomiary z bazy do pliku CSV, JSON Lines lub Parquet.
+
+    Działanie funkcji:
+    1. Ustala format (parametr fmt lub rozszerzenie pliku) i kompresję gzip
+       (parametr compress lub końcówka .gz).
+    2. Pobiera pomiary spełniające filtry w paczkach po chunk_size wierszy.
+    3. Każdą paczkę od razu zapisuje do pliku, więc zużycie pamięci nie zależy od liczby wierszy.
+
+    Zwraca liczbę wyeksportowanych wierszy.
+    Rzuca ExportError dla nieznanego formatu lub braku biblioteki pyarrow przy eksporcie do Parquet.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in WRITERS:
+        raise ExportError(f"Nieobsługiwany format eksportu: {fmt}")
+    if compress is None:
+        compress = path.lower().endswith(".gz")
+
+    chunks = iter_measurement_chunks(sensor_id, station_id, param_key, date_from, date_to, chunk_size)
+    return WRITERS[fmt](path, chunks, compress)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Eksport pomiarów z bazy danych do pliku.")
+    parser.add_argument("output", help="Ścieżka pliku wynikowego (.csv, .jsonl, .parquet, opcjonalnie .gz)")
+    parser.add_argument("--format", choices=FORMATS, help="Format pliku (domyślnie na podstawie rozszerzenia)")
+    parser.add_argument("--gzip", action="store_true", default=None, help="Kompresja gzip")
+    parser.add_argument("--sensor", type=int, help="ID czujnika")
+    parser.add_argument("--station", type=int, help="ID stacji")
+    parser.add_argument("--param", help="Kod parametru, np. PM10")
+    parser.add_argument("--date-from", help="Data początkowa YYYY-MM-DD")
+    parser.add_argument("--date-to", help="Data końcowa YYYY-MM-DD")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Liczba wierszy w paczce")
+    args = parser.parse_args(argv)
+
+    try:
+        count = export_measurements(
+            args.output, args.format, args.gzip, args.sensor, args.station,
+            args.param, args.date_from, args.date_to, args.chunk_size
+        )
+    except ExportError as e:
+        parser.exit(1, f"{e}\n")
+    print(f"Wyeksportowano {count} pomiarów do pliku {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+import queue
+import sqlite3
+import threading
+import time
+
+import db.database as database
+from db.database import (
+    station_row, sensor_row, measurement_row, write_stations, write_sensors, write_measurements
+)
+
+BATCH_SIZE = 1000           # maksymalna liczba rekordów w jednej transakcji
+FLUSH_INTERVAL = 0.2        # maksymalny czas (s) oczekiwania rekordu na zapis
+MAX_QUEUE = 10000           # pojemność kolejki; po jej zapełnieniu producenci czekają
+BUSY_TIMEOUT = 30           # czas (s) oczekiwania na blokadę zapisu trzymaną przez inny proces
+
+# Błędy pojedynczych rekordów (np. niepoprawne ID); po nich paczka jest zapisywana ponownie rekord po rekordzie.
+# Pozostałe błędy (np. zablokowana baza) dotyczą całej paczki i zatrzymują wątek zapisujący.
+RECORD_ERRORS = (sqlite3.IntegrityError, sqlite3.InterfaceError, ValueError)
+
+_STOP = object()
+
+
+class IngestQueueFull(Exception):
+    """Wyjątek podnoszony, gdy kolejka zapisu jest pełna, a producent nie może czekać."""
+    pass
+
+
+class IngestWriterStopped(Exception):
+    """Wyjątek podnoszony, gdy wątek zapisujący został zamknięty lub zakończył się błędem."""
+    pass
+
+
+class FlushHandle:
+    """
+    Uchwyt zwracany przez IngestWriter.flush() i IngestWriter.execute(). Metoda wait() czeka,
+    aż wszystkie rekordy przekazane przed wywołaniem zostaną zatwierdzone w bazie
+    (a w przypadku execute() - aż zadanie zostanie wykonane).
+    """
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.error = None
+
+    def _resolve(self, error=None):
+        self.error = error
+        self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Czeka na zapis. Zwraca False po przekroczeniu czasu, a jeśli zapis się nie powiódł,
+        rzuca wyjątek, który wystąpił w wątku zapisującym.
+        """
+        if not self._done.wait(timeout):
+            return False
+        if self.error is not None:
+            raise self.error
+        return True
+
+
+class IngestWriter:
+    """
+    Jedyny wątek zapisujący do bazy. Producenci (GUI, pobieranie w tle, uzupełnianie historii)
+    tylko wstawiają rekordy do kolejki, a wątek zapisujący łączy je w paczki i zatwierdza
+    jedną transakcją, gdy paczka osiągnie batch_size rekordów lub minie flush_interval sekund.
+    Dzięki temu nie ma rywalizacji o blokadę zapisu SQLite ani kosztu commitu na każde wywołanie.
+
+    Rekordy są zamieniane na krotki kolumn już w put_*, więc niekompletne dane rzucają wyjątek
+    w wątku producenta i nie trafiają do kolejki. Inne zapisy (przeliczenie indeksu, czyszczenie
+    bazy) są przekazywane przez execute() i wykonywane w tym samym wątku, po zapisaniu
+    wcześniejszych rekordów.
+    """
+
+    def __init__(self, db_path=None, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 max_queue=MAX_QUEUE, autostart=True):
+        self.db_path = db_path or database.DB_PATH
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.batches_committed = 0
+        self.last_error = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        # Uchwyty flush() czekające na zapis; po zatrzymaniu wątku są rozwiązywane z błędem
+        self._handles = set()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._failure = None
+        self._thread = threading.Thread(target=self._run, name="IngestWriter", daemon=True)
+        if autostart:
+            self.start()
+
+    def start(self):
+        self._thread.start()
+
+    def _check_running(self):
+        if self._stopped:
+            raise IngestWriterStopped("Wątek zapisu do bazy nie działa.") from self._failure
+
+    def _put(self, item, block, timeout):
+        self._check_running()
+        try:
+            self._queue.put(item, block=block, timeout=timeout)
+        except queue.Full:
+            raise IngestQueueFull("Kolejka zapisu do bazy jest pełna.") from None
+
+    def put_station(self, station, block=True, timeout=None):
+        """Dodaje stację do kolejki zapisu. Przy pełnej kolejce czeka (lub rzuca IngestQueueFull)."""
+        self._put(("station", station_row(station)), block, timeout)
+
+    def put_sensor(self, sensor, block=True, timeout=None):
+        """Dodaje czujnik do kolejki zapisu. Przy pełnej kolejce czeka (lub rzuca IngestQueueFull)."""
+        self._put(("sensor", sensor_row(sensor)), block, timeout)
+
+    def put_measurements(self, sensor_id, param_key, measurements, block=True, timeout=None):
+        """Dodaje pomiary czujnika do kolejki zapisu. Przy pełnej kolejce czeka (lub rzuca IngestQueueFull)."""
+        rows = [measurement_row(m) for m in measurements]
+        self._put(("measurements", (sensor_id, param_key, rows)), block, timeout)
+
+    def flush(self):
+        """
+        Wymusza zapis wszystkiego, co trafiło do kolejki przed tym wywołaniem.
+        Zwraca FlushHandle, na którym można poczekać na zatwierdzenie transakcji.
+        """
+        return self._control("flush", None)
+
+    def execute(self, func, *args):
+        """
+        Wykonuje func(cursor, *args) w wątku zapisującym w osobnej transakcji, po zatwierdzeniu
+        wszystkiego, co trafiło do kolejki przed tym wywołaniem. Zwraca FlushHandle, którego
+        wait() rzuca wyjątek zgłoszony przez func.
+        """
+        return self._control("task", (func, args))
+
+    def _control(self, kind, payload):
+        handle = FlushHandle()
+        with self._lock:
+            self._check_running()
+            self._handles.add(handle)
+        self._queue.put((kind, (handle, payload)))
+        return handle
+
+    def close(self, timeout=None):
+        """Zapisuje pozostałe rekordy i kończy wątek zapisujący."""
+        if self._thread.is_alive():
+            self._queue.put((_STOP, None))
+            self._thread.join(timeout)
+        else:
+            self._stopped = True
+
+    def _resolve(self, handle, error=None):
+        with self._lock:
+            self._handles.discard(handle)
+        handle._resolve(error)
+
+    def _run(self):
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT)
+            try:
+                self._process(conn)
+            finally:
+                conn.close()
+        except Exception as e:
+            self.last_error = self._failure = e
+        finally:
+            self._shutdown()
+
+    def _shutdown(self):
+        """
+        Oznacza wątek jako zatrzymany i rozwiązuje wszystkie oczekujące uchwyty flush() błędem,
+        który zatrzymał wątek. Pozostałe rekordy są usuwane z kolejki, żeby nie blokowała producentów.
+        """
+        with self._lock:
+            self._stopped = True
+            handles = list(self._handles)
+            self._handles.clear()
+        error = self._failure or IngestWriterStopped("Wątek zapisu do bazy został zatrzymany.")
+        for handle in handles:
+            handle._resolve(error)
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def _process(self, conn):
+        stop = False
+        # Pierwszy błąd od ostatniego flush() - zgłaszany w najbliższym uchwycie
+        pending_error = None
+        while not stop:
+            kind, payload = self._queue.get()
+            batch, control, size = [], None, 0
+            deadline = time.monotonic() + self.flush_interval
+
+            # Zbieranie paczki: do batch_size rekordów, upływu flush_interval lub żądania flush/zadania/stop
+            while True:
+                if kind is _STOP:
+                    stop = True
+                    break
+                if kind in ("flush", "task"):
+                    control = (kind, payload)
+                    break
+                batch.append((kind, payload))
+                size += len(payload[2]) if kind == "measurements" else 1
+                if size >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    kind, payload = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if batch:
+                error = self._commit(conn, batch)
+                pending_error = pending_error or error
+            if control is None:
+                continue
+            kind, (handle, payload) = control
+            if kind == "flush":
+                self._resolve(handle, pending_error)
+                pending_error = None
+            else:
+                self._resolve(handle, self._execute(conn, *payload))
+
+    def _commit(self, conn, batch):
+        """
+        Zapisuje paczkę rekordów w jednej transakcji. Jeśli transakcja nie powiedzie się z powodu
+        błędnego rekordu (RECORD_ERRORS), rekordy są zapisywane ponownie pojedynczo, więc odrzucane
+        są tylko te, których nie da się zapisać. Zwraca pierwszy błąd odrzuconego rekordu albo None.
+
+        Inne błędy (np. baza zablokowana dłużej niż BUSY_TIMEOUT) dotyczą całej paczki - ponawianie
+        jej rekord po rekordzie trwałoby BUSY_TIMEOUT na każdy rekord, więc wyjątek jest przekazywany
+        dalej i zatrzymuje wątek, a oczekujące uchwyty flush() dostają ten błąd.
+        """
+        try:
+            self._write(conn, batch)
+            return None
+        except RECORD_ERRORS:
+            pass
+
+        first_error = None
+        for record in batch:
+            try:
+                self._write(conn, [record])
+            except RECORD_ERRORS as e:
+                self.last_error = e
+                first_error = first_error or e
+        return first_error
+
+    def _write(self, conn, batch):
+        """
+        Zapisuje rekordy w jednej transakcji (przy błędzie wycofuje ją i rzuca wyjątek).
+        Stacje i czujniki są zapisywane przed pomiarami; pomiary tego samego czujnika
+        są łączone w jedno wywołanie.
+        """
+        stations = [payload for kind, payload in batch if kind == "station"]
+        sensors = [payload for kind, payload in batch if kind == "sensor"]
+        measurements = {}
+        for kind, payload in batch:
+            if kind == "measurements":
+                sensor_id, param_key, rows = payload
+                measurements.setdefault((sensor_id, param_key), []).extend(rows)
+
+        cursor = conn.cursor()
+        try:
+            write_stations(cursor, stations)
+            write_sensors(cursor, sensors)
+            for (sensor_id, param_key), rows in measurements.items():
+                write_measurements(cursor, sensor_id, param_key, rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        self.batches_committed += 1
+
+    def _execute(self, conn, func, args):
+        """
+        Wykonuje zadanie przekazane przez execute() w jednej transakcji.
+        Zwraca błąd zadania albo None; błąd nie zatrzymuje wątku zapisującego.
+        """
+        cursor = conn.cursor()
+        try:
+            func(cursor, *args)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            return e
+        finally:
+            cursor.close()
+        return None
@@ -1,19 +1,34 @@
+import sqlite3
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
 from api.stations import get_all_stations, filter_stations_by_city, get_sensors_for_station, APIConnectionError
 from api.sensors import get_sensor_data
 from db.database import (
     create_table,
     create_measurements_table,
-    insert_station,
-    insert_measurements,
     create_sensors_table,
-    insert_sensor,
-    clear_database
+    create_air_index_table,
+    get_anomalies,
+    get_cities,
+    get_stations_by_city,
+    get_sensor_days,
+    get_measurements,
+    days_from_bitmap,
+    clear_tables
 )
+from db.writer import IngestWriter, IngestWriterStopped
+from db.export import export_measurements, ExportError
+from analysis.air_index import POLLUTANTS, write_air_quality_index, get_latest_indices
+from gui.autocomplete import CityIndex, CityAutocomplete
+from gui.date_picker import DatePicker
 from visualization.plotting import plot_measurements
 
+WRITE_TIMEOUT = 60      # maksymalny czas (s) oczekiwania na zapis danych do bazy
+# Błędy przekazania danych do zapisu: niekompletne dane z API lub zatrzymany wątek zapisujący
+WRITE_ERRORS = (KeyError, TypeError, ValueError, IngestWriterStopped)
+
 
 class AirQualityApp:
     def __init__(self, root):
@@ -23,6 +38,11 @@ class AirQualityApp:
         create_table()
         create_measurements_table()
         create_sensors_table()
+        create_air_index_table()
+
+        # Wszystkie zapisy do bazy przechodzą przez jeden wątek zapisujący
+        self.writer = IngestWriter()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         self.city_var = tk.StringVar()
         self.station_var = tk.StringVar()
@@ -34,12 +54,19 @@ class AirQualityApp:
         self.sensors = []
         self.sensor_id = None
         self.stats_label = None
+        self.available_days = {}
 
         # Statystyki
         self.stats_frame = None
         self.max_label = None
         self.min_label = None
         self.avg_label = None
+        self.anomaly_label = None
+
+        # Lokalny indeks miast do podpowiedzi; przy pustej bazie pobierany w tle z API
+        self.city_index = CityIndex(get_cities())
+        if not len(self.city_index):
+            threading.Thread(target=self.load_city_index, daemon=True).start()
 
         self.build_ui()
 
@@ -51,7 +78,10 @@ class AirQualityApp:
 
         # Miasto
         ttk.Label(self.root, text="Miasto:").grid(row=0, column=0, sticky="w", padx=5, pady=5)
-        ttk.Entry(self.root, textvariable=self.city_var).grid(row=0, column=1, sticky="ew", padx=5)
+        self.city_entry = ttk.Entry(self.root, textvariable=self.city_var)
+        self.city_entry.grid(row=0, column=1, sticky="ew", padx=5)
+        self.city_entry.bind("<Return>", lambda e: self.load_stations())
+        self.city_autocomplete = CityAutocomplete(self.city_entry, lambda: self.city_index, self.select_city)
         ttk.Button(self.root, text="Pobierz stacje", command=self.load_stations).grid(row=0, column=2, padx=5, pady=5)
 
         # Lista stacji
@@ -69,12 +99,18 @@ class AirQualityApp:
 
         # Data od / do
         ttk.Label(self.root, text="Data od:").grid(row=4, column=0, sticky="e", padx=5)
-        self.date_from_box = ttk.Combobox(self.root, textvariable=self.date_from_var, state="readonly", width=20)
-        self.date_from_box.grid(row=4, column=1, sticky="w", padx=5)
+        date_from_frame = ttk.Frame(self.root)
+        date_from_frame.grid(row=4, column=1, sticky="w", padx=5)
+        ttk.Entry(date_from_frame, textvariable=self.date_from_var, state="readonly", width=12).grid(row=0, column=0)
+        ttk.Button(date_from_frame, text="Kalendarz", command=lambda: self.open_date_picker(self.date_from_var)).grid(
+            row=0, column=1, padx=2)
 
         ttk.Label(self.root, text="Data do:").grid(row=4, column=2, sticky="e", padx=5)
-        self.date_to_box = ttk.Combobox(self.root, textvariable=self.date_to_var, state="readonly", width=20)
-        self.date_to_box.grid(row=4, column=3, sticky="w", padx=5)
+        date_to_frame = ttk.Frame(self.root)
+        date_to_frame.grid(row=4, column=3, sticky="w", padx=5)
+        ttk.Entry(date_to_frame, textvariable=self.date_to_var, state="readonly", width=12).grid(row=0, column=0)
+        ttk.Button(date_to_frame, text="Kalendarz", command=lambda: self.open_date_picker(self.date_to_var)).grid(
+            row=0, column=1, padx=2)
 
         # Pobierz dane
         ttk.Button(self.root, text="Pobierz dane", command=self.load_measurements).grid(
@@ -95,6 +131,9 @@ class AirQualityApp:
         self.avg_label = ttk.Label(self.stats_frame, text="Średnia: -")
         self.avg_label.grid(row=2, column=0, sticky="w", padx=10)
 
+        self.anomaly_label = ttk.Label(self.stats_frame, text="Anomalie: -")
+        self.anomaly_label.grid(row=3, column=0, sticky="w", padx=10)
+
         # pozostałe
         ttk.Button(self.root, text="Wykres", command=self.plot_data).grid(
             row=7, column=1, sticky="ew", padx=5, pady=10
@@ -105,6 +144,12 @@ class AirQualityApp:
         ttk.Button(self.root, text="Usuń dane z bazy", command=self.delete_data_from_db).grid(
             row=8, column=1, columnspan=2, sticky="ew", padx=5, pady=10
         )
+        ttk.Button(self.root, text="Indeks jakości powietrza", command=self.show_air_index).grid(
+            row=9, column=1, columnspan=2, sticky="ew", padx=5, pady=10
+        )
+        ttk.Button(self.root, text="Eksportuj dane", command=self.export_data).grid(
+            row=10, column=1, columnspan=2, sticky="ew", padx=5, pady=10
+        )
 
     def load_stations(self):
         """
@@ -113,34 +158,66 @@ class AirQualityApp:
         Działanie funkcji:
         1. Odczytuje nazwę miasta wprowadzonego przez użytkownika w polu tekstowym.
         2. Jeśli pole miasta jest puste – wyświetla ostrzeżenie i kończy działanie.
-        3. Pobiera wszystkie dostępne stacje z API i filtruje je według podanego miasta.
-        4. Jeśli nie znaleziono stacji – informuje użytkownika i kończy działanie.
-        5. Wyświetla listę znalezionych stacji w rozwijanym polu (Combobox).
-        6. Zapisuje informacje o każdej znalezionej stacji do bazy danych (SQLite).
+        3. Szuka stacji miasta w lokalnej bazie danych (SQLite).
+        4. Jeśli w bazie ich nie ma – pobiera wszystkie dostępne stacje z API, filtruje je według
+           podanego miasta i zapisuje wszystkie do bazy, uzupełniając lokalny indeks miast.
+        5. Jeśli nie znaleziono stacji – informuje użytkownika i kończy działanie.
+        6. Wyświetla listę znalezionych stacji w rozwijanym polu (Combobox).
         7. Automatycznie zaznacza pierwszą stację z listy jako domyślną.
         """
         city = self.city_var.get().strip()
+        self.city_autocomplete.hide()
         if not city:
             messagebox.showwarning("Uwaga", "Wprowadź nazwę miasta.")
             return
 
-        try:
-            all_stations = get_all_stations()
-        except APIConnectionError as e:
-            messagebox.showerror("Błąd połączenia", str(e))
-            all_stations = []
+        self.stations = get_stations_by_city(city)
+        if not self.stations:
+            try:
+                all_stations = get_all_stations()
+            except APIConnectionError as e:
+                messagebox.showerror("Błąd połączenia", str(e))
+                all_stations = []
 
-        self.stations = filter_stations_by_city(all_stations, city)
+            self.stations = filter_stations_by_city(all_stations, city)
+            self.queue_write(self.store_stations, all_stations)
 
         if not self.stations:
             messagebox.showinfo("Brak wyników", f"Brak stacji w mieście: {city}")
             return
 
         self.station_box['values'] = [f"{s['stationName']} (ID: {s['id']})" for s in self.stations]
-        for s in self.stations:
-            insert_station(s)
         self.station_box.current(0)
 
+    def store_stations(self, stations):
+        """
+        Zapisuje listę stacji do bazy i odświeża lokalny indeks miast używany w podpowiedziach.
+        """
+        if not stations:
+            return
+        for s in stations:
+            self.writer.put_station(s)
+        self.city_index = CityIndex(
+            self.city_index.cities() + [(s.get('city') or {}).get('name', '') for s in stations]
+        )
+
+    def load_city_index(self):
+        """
+        Pobiera w tle listę wszystkich stacji z API, aby podpowiedzi miast działały od pierwszego uruchomienia.
+        Wywoływana w osobnym wątku - nie korzysta z widżetów Tkinter.
+        """
+        try:
+            self.store_stations(get_all_stations())
+        except (APIConnectionError, *WRITE_ERRORS):
+            pass
+
+    def select_city(self, city):
+        """
+        Obsługuje wybór miasta z listy podpowiedzi - od razu wyszukuje jego stacje.
+        """
+        self.city_var.set(city)
+        self.load_stations()
+
 
     def load_sensors(self):
         """
@@ -175,7 +252,8 @@ class AirQualityApp:
 
         self.sensor_box['values'] = [f"{s['param']['paramName']} ({s['param']['paramFormula']}) - ID: {s['id']}" for s in self.sensors]
         for s in self.sensors:
-            insert_sensor(s)
+            if not self.queue_write(self.writer.put_sensor, s):
+                break
         self.sensor_box.current(0)
 
 
@@ -187,14 +265,13 @@ class AirQualityApp:
         Działanie funkcji:
         1. Sprawdza, czy użytkownik wybrał czujnik z listy.
            Jeśli nie – wyświetla ostrzeżenie i przerywa działanie.
-        2. Pobiera dane pomiarowe dla wybranego czujnika (po ID) z API.
-        3. Weryfikuje, czy dane istnieją i zawierają pomiary. Jeśli nie – informuje użytkownika.
-        4. Filtrowane są tylko wartości, które posiadają niepuste wartości (`value is not None`).
-        5. Z danych wyodrębnia listę unikalnych dat (w formacie `YYYY-MM-DD`) i sortuje je.
-        6. Jeśli nie ma dostępnych dat – wyświetla odpowiedni komunikat.
-        7. Wypełnia listy wyboru (Comboboxy) dla zakresu dat („od” i „do”) dostępnymi wartościami.
-        8. Resetuje ewentualne wcześniejsze wybory dat.
-        9. Informuje użytkownika o liczbie dostępnych dat
+        2. Pobiera dane pomiarowe dla wybranego czujnika (po ID) z API i zapisuje je do bazy.
+           Przy braku połączenia korzysta tylko z danych zapisanych wcześniej.
+        3. Odczytuje z bazy mapę dni z pomiarami czujnika (jeden wiersz na rok),
+           bez przeglądania samych pomiarów.
+        4. Jeśli nie ma dostępnych dat – wyświetla odpowiedni komunikat.
+        5. Resetuje ewentualne wcześniejsze wybory dat; daty wybiera się w kalendarzu.
+        6. Informuje użytkownika o liczbie dostępnych dat
 
         """
         if not self.sensor_box.get():
@@ -209,33 +286,36 @@ class AirQualityApp:
             data = get_sensor_data(self.sensor_id)
         except APIConnectionError as e:
             messagebox.showerror("Błąd połączenia", str(e))
-            return
-
-        if not data or 'values' not in data:
-            messagebox.showinfo("Brak danych", "Brak danych pomiarowych dla tego czujnika.")
-            return
+            data = None
 
-        self.raw_values = [
-            (item['date'], item['value'])
-            for item in data['values']
-            if item['value'] is not None
-        ]
+        if data and 'values' in data:
+            if not self.queue_write(self.writer.put_measurements, self.sensor_id, data.get('key', ''), data['values']):
+                return
+            if not self.wait_for_writes():
+                return
 
-        # Wyciągnięcie listy unikalnych dat
-        all_dates = sorted({item['date'][:10] for item in data['values'] if item['value'] is not None})
+        self.available_days = get_sensor_days(self.sensor_id)
+        days_count = sum(int.from_bytes(bitmap, "little").bit_count() for bitmap in self.available_days.values())
 
-        if not all_dates:
+        if not days_count:
             messagebox.showinfo("Brak danych", "Brak dostępnych dat pomiarowych.")
             return
 
-        self.date_from_box['values'] = all_dates
-        self.date_to_box['values'] = all_dates
-
         # Wyczyść poprzednie wybory
         self.date_from_var.set("")
         self.date_to_var.set("")
 
-        messagebox.showinfo("Sukces", f"Pobrano {len(all_dates)} dostępnych dat.")
+        messagebox.showinfo("Sukces", f"Pobrano {days_count} dostępnych dat.")
+
+    def open_date_picker(self, date_var):
+        """
+        Otwiera kalendarz z dniami, dla których w bazie są pomiary wybranego czujnika,
+        i po wyborze dnia wpisuje go do podanego pola daty.
+        """
+        if not self.available_days:
+            messagebox.showwarning("Uwaga", "Najpierw pobierz daty dla wybranego czujnika.")
+            return
+        DatePicker(self.root, self.available_days, date_var.set, initial=date_var.get())
 
 
 
@@ -248,13 +328,12 @@ class AirQualityApp:
         2. Na podstawie indeksu w `sensor_box` identyfikuje czujnik oraz jego ID i nazwę parametru.
         3. Pobiera dane pomiarowe z API dla danego czujnika.
         4. Jeśli dane są puste lub nie zawierają listy pomiarów – wyświetla informację i kończy działanie.
-        5. Wstawia dane pomiarowe do lokalnej bazy danych.
-        6. Filtruje dane, pozostawiając tylko te, które zawierają wartość (`value != None`), i zapisuje je do `self.raw_values`.
-        7. Tworzy listę unikalnych dat z danych i przypisuje je do comboboxów wyboru zakresu dat.
-        8. Ustawia domyślny zakres dat, jeśli nie został wcześniej wybrany.
-        9. Pobiera wartości mieszczące się w wybranym zakresie dat.
-        10. Oblicza i wyświetla statystyki: minimum, maksimum oraz średnią wartość dla danego okresu.
-        11. Wyniki są prezentowane w GUI oraz przechowywane w `self.filtered_values`.
+        5. Wstawia dane pomiarowe do lokalnej bazy danych i czeka na ich zapis.
+        6. Odczytuje z bazy mapę dni z pomiarami czujnika (dla kalendarza wyboru dat).
+        7. Ustawia domyślny zakres dat (pierwszy i ostatni dzień z pomiarami), jeśli nie został wcześniej wybrany.
+        8. Pobiera z bazy wartości mieszczące się w wybranym zakresie dat (także starsze niż dane z API).
+        9. Oblicza i wyświetla statystyki: minimum, maksimum oraz średnią wartość dla danego okresu.
+        10. Wyniki są prezentowane w GUI.
 
         Efekt:
         - Statystyki (minimum, maksimum, średnia) dla pomiarów z wybranego zakresu dat zostają obliczone i pokazane w interfejsie.
@@ -274,45 +353,34 @@ class AirQualityApp:
             messagebox.showerror("Błąd połączenia", str(e))
             return
 
-        self.param_name = sensor['param']['paramName']
-
         if not data or 'values' not in data:
             messagebox.showinfo("Brak danych", "Brak danych pomiarowych dla tego czujnika.")
             return
 
         param_key = data.get('key', '')
-        insert_measurements(self.sensor_id, param_key, data['values'])
-
-        self.raw_values = [
-            (item['date'], item['value'])
-            for item in data['values']
-            if item['value'] is not None
-        ]
-        # Wyciągnięcie listy dostępnych dat
-        all_dates = sorted({item['date'][:10] for item in data['values'] if item['value'] is not None})
-        if not all_dates:
-            messagebox.showinfo("Brak danych", "Brak wartości do analizy.")
+        if not self.queue_write(self.writer.put_measurements, self.sensor_id, param_key, data['values']):
+            return
+        if not self.wait_for_writes():
             return
 
-        # Ustaw dostępne daty w dropdownach
-        self.date_from_box['values'] = all_dates
-        self.date_to_box['values'] = all_dates
+        self.available_days = get_sensor_days(self.sensor_id)
+        if not self.available_days:
+            messagebox.showinfo("Brak danych", "Brak wartości do analizy.")
+            return
 
+        # Domyślny zakres: pierwszy i ostatni dzień z pomiarami
+        years = sorted(self.available_days)
         if not self.date_from_var.get():
-            self.date_from_var.set(all_dates[0])
+            self.date_from_var.set(days_from_bitmap(years[0], self.available_days[years[0]])[0].isoformat())
         if not self.date_to_var.get():
-            self.date_to_var.set(all_dates[-1])
+            self.date_to_var.set(days_from_bitmap(years[-1], self.available_days[years[-1]])[-1].isoformat())
 
         date_range = self.get_valid_date_range()
         if not date_range:
             return
         date_from, date_to = date_range
 
-        values = [
-            (item['date'], item['value'])
-            for item in data['values']
-            if item['value'] is not None and date_from <= datetime.strptime(item['date'][:10], "%Y-%m-%d") <= date_to
-        ]
+        values = get_measurements(self.sensor_id, date_from.strftime("%Y-%m-%d"), date_to.strftime("%Y-%m-%d"))
 
         if not values:
             messagebox.showinfo("Brak danych", "Brak wartości w wybranym zakresie dat.")
@@ -332,24 +400,48 @@ class AirQualityApp:
         self.min_label.config(text=f"Minimum: {min_entry[1]} ({min_entry[0][:16].replace('T', ' ')})")
         self.max_label.config(text=f"Maksimum: {max_entry[1]} ({max_entry[0][:16].replace('T', ' ')})")
         self.avg_label.config(text=f"Średnia: {avg_value:.2f}")
+        self.show_anomalies(date_from_str, date_to_str)
 
-        # Zapisz przefiltrowane dane do atrybutu
-        self.filtered_values = values
+    def show_anomalies(self, date_from_str, date_to_str):
+        """
+        Wyświetla liczbę anomalii (skoki, płaska linia, przerwy w pomiarach) wykrytych
+        podczas zapisu danych wybranego czujnika w podanym zakresie dat.
+        """
+        anomalies = get_anomalies(self.sensor_id, date_from_str, date_to_str)
+        if not anomalies:
+            self.anomaly_label.config(text="Anomalie: brak")
+            return
+
+        kinds = [kind for _, kind, _, _ in anomalies]
+        self.anomaly_label.config(
+            text=f"Anomalie: {len(anomalies)} (skoki: {kinds.count('spike')}, "
+                 f"płaska linia: {kinds.count('flatline')}, przerwy: {kinds.count('dropout')})"
+        )
 
     def plot_data(self):
         """
         Tworzy wykres danych pomiarowych dla wybranego czujnika i zakresu dat.
-        Jeśli dane nie są dostępne, wyświetlany jest komunikat informacyjny.
+        Pomiary są odczytywane z bazy przy każdym wywołaniu, więc wykres zawsze odpowiada
+        aktualnie wybranemu czujnikowi i datom. Jeśli dane nie są dostępne, wyświetlany jest komunikat informacyjny.
         """
+        if not self.sensor_box.get():
+            messagebox.showwarning("Uwaga", "Najpierw wybierz czujnik.")
+            return
+        sensor = self.sensors[self.sensor_box.current()]
 
-        filtered = self.get_filtered_values()
-        if not filtered:
+        date_range = self.get_valid_date_range()
+        if not date_range:
+            return
+        date_from, date_to = date_range
+
+        values = get_measurements(sensor['id'], date_from.strftime("%Y-%m-%d"), date_to.strftime("%Y-%m-%d"))
+        if not values:
             messagebox.showinfo("Brak danych", "Brak danych do wyświetlenia wykresu.")
             return
 
         # Konwertuj dane do formatu dla plot_measurements
-        data_for_plot = [(d, v, None) for d, v in filtered]
-        plot_measurements(data_for_plot, self.param_name)
+        data_for_plot = [(d, v, None) for d, v in values]
+        plot_measurements(data_for_plot, sensor['param']['paramName'])
 
 
     def clear_data(self):
@@ -364,40 +456,16 @@ class AirQualityApp:
         self.city_var.set("")
         self.date_from_var.set("")
         self.date_to_var.set("")
-        self.date_from_box['values'] = []
-        self.date_to_box['values'] = []
+        self.available_days = {}
+        self.city_autocomplete.hide()
         if self.stats_frame:
             self.stats_frame.config(text="Statystyki pomiarów")
             self.min_label.config(text="Minimum: -")
             self.max_label.config(text="Maksimum: -")
             self.avg_label.config(text="Średnia: -")
+            self.anomaly_label.config(text="Anomalie: -")
         messagebox.showinfo("Wyczyszczono", "Dane i statystyki zostały wyczyszczone.")
 
-    def get_filtered_values(self):
-        """
-        Zwraca listę pomiarów (data, wartość) z `self.raw_values`,
-        które mieszczą się w wybranym zakresie dat określonym przez
-        pola `date_from_var` i `date_to_var`.
-
-        Jeśli `raw_values` nie istnieje lub zakres dat jest niepoprawny,
-        zwraca pustą listę.
-
-        Format daty w `raw_values` jest oczekiwany jako ISO (YYYY-MM-DD...).
-        """
-        if not hasattr(self, 'raw_values'):
-            return []
-
-        date_range = self.get_valid_date_range()
-        if not date_range:
-            return []
-        date_from, date_to = date_range
-
-        return [
-            (d, v)
-            for d, v in self.raw_values
-            if date_from <= datetime.strptime(d[:10], "%Y-%m-%d") <= date_to
-        ]
-
     def get_valid_date_range(self):
         """
         Zwraca krotkę (date_from, date_to) jako obiekty datetime,
@@ -419,13 +487,117 @@ class AirQualityApp:
 
         return date_from, date_to
 
+    def show_air_index(self):
+        """
+        Wyświetla tabelę z najnowszym indeksem jakości powietrza dla wszystkich stacji zapisanych w bazie.
+        Przed wyświetleniem indeks jest przeliczany przyrostowo - tylko dla godzin z nowymi pomiarami -
+        w wątku zapisującym, żeby nie rywalizować z nim o blokadę zapisu bazy.
+        """
+        if not self.wait_for_writes() or not self.wait_for_writes(write_air_quality_index):
+            return
+        indices = get_latest_indices()
+        if not indices:
+            messagebox.showinfo("Brak danych", "Brak pomiarów w bazie do wyliczenia indeksu.")
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title("Indeks jakości powietrza")
+
+        columns = ("city", "station", "hour", *POLLUTANTS, "index")
+        headers = ("Miasto", "Stacja", "Godzina", *POLLUTANTS, "Indeks")
+        tree = ttk.Treeview(window, columns=columns, show="headings", height=20)
+        for column, header in zip(columns, headers):
+            tree.heading(column, text=header)
+            tree.column(column, width=70 if column in POLLUTANTS else 140)
+
+        for item in indices:
+            sub_indices = ["-" if v is None else v for v in item['sub_indices'].values()]
+            tree.insert("", "end", values=(
+                item['city'], item['station_name'], item['hour'], *sub_indices, item['index_name']
+            ))
+
+        scrollbar = ttk.Scrollbar(window, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.grid(row=0, column=0, sticky="nsew")
+        scrollbar.grid(row=0, column=1, sticky="ns")
+        window.grid_rowconfigure(0, weight=1)
+        window.grid_columnconfigure(0, weight=1)
+
+    def export_data(self):
+        """
+        Eksportuje zapisane w bazie pomiary wybranego czujnika z wybranego zakresu dat do pliku
+        CSV, JSON Lines lub Parquet (format wg rozszerzenia, końcówka .gz włącza kompresję).
+        Jeśli nie wybrano czujnika, eksportowane są wszystkie pomiary z bazy.
+        """
+        # Czujnik jak w plot_data - aktualnie wybrany na liście, a nie ostatnio pobrany
+        sensor_id = self.sensors[self.sensor_box.current()]['id'] if self.sensor_box.get() else None
+
+        path = filedialog.asksaveasfilename(
+            title="Eksport pomiarów",
+            defaultextension=".csv",
+            filetypes=[
+                ("CSV", "*.csv"), ("CSV gzip", "*.csv.gz"),
+                ("JSON Lines", "*.jsonl"), ("JSON Lines gzip", "*.jsonl.gz"),
+                ("Parquet", "*.parquet"),
+            ]
+        )
+        if not path or not self.wait_for_writes():
+            return
+
+        try:
+            count = export_measurements(
+                path,
+                sensor_id=sensor_id,
+                date_from=self.date_from_var.get() or None,
+                date_to=self.date_to_var.get() or None,
+            )
+        except (ExportError, OSError, sqlite3.Error) as e:
+            messagebox.showerror("Błąd eksportu", str(e))
+            return
+
+        messagebox.showinfo("Sukces", f"Wyeksportowano {count} pomiarów do pliku:\n{path}")
+
+    def queue_write(self, put, *args):
+        """
+        Przekazuje dane do wątku zapisującego (np. put_measurements albo store_stations).
+        Zwraca False (po wyświetleniu komunikatu), jeśli danych nie można przyjąć do zapisu.
+        """
+        try:
+            put(*args)
+        except WRITE_ERRORS as e:
+            messagebox.showerror("Błąd", f"Nie można zapisać danych do bazy:\n{e}")
+            return False
+        return True
+
+    def wait_for_writes(self, task=None, *args):
+        """
+        Czeka (najwyżej WRITE_TIMEOUT sekund), aż wszystkie dane przekazane do zapisu zostaną
+        zatwierdzone w bazie. Jeśli podano task, najpierw zleca wątkowi zapisującemu wykonanie
+        task(cursor, *args) i czeka na jego zakończenie. Zwraca False (po wyświetleniu komunikatu),
+        jeśli zapis się nie powiódł lub nie zakończył w tym czasie.
+        """
+        try:
+            handle = self.writer.flush() if task is None else self.writer.execute(task, *args)
+            done = handle.wait(timeout=WRITE_TIMEOUT)
+        except Exception as e:
+            messagebox.showerror("Błąd", f"Wystąpił problem podczas zapisu danych do bazy:\n{e}")
+            return False
+        if not done:
+            messagebox.showerror("Błąd", "Zapis danych do bazy trwa zbyt długo. Spróbuj ponownie później.")
+            return False
+        return True
+
+    def on_close(self):
+        """
+        Zapisuje oczekujące dane i zamyka aplikację.
+        """
+        self.writer.close()
+        self.root.destroy()
+
     def delete_data_from_db(self):
         confirm = messagebox.askyesno("Potwierdzenie", "Czy na pewno chcesz usunąć wszystkie dane z bazy?")
-        if confirm:
-            try:
-                clear_database()
-                messagebox.showinfo("Sukces", "Wszystkie dane zostały usunięte z bazy.")
-                self.clear_data()
-            except Exception as e:
-                messagebox.showerror("Błąd", f"Wystąpił problem podczas usuwania danych:\n{e}")
+        # Dane są usuwane w wątku zapisującym, po zapisaniu wszystkiego, co już trafiło do kolejki
+        if confirm and self.wait_for_writes() and self.wait_for_writes(clear_tables):
+            messagebox.showinfo("Sukces", "Wszystkie dane zostały usunięte z bazy.")
+            self.clear_data()
 
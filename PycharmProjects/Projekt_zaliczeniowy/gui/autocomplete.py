@@ -0,0 +1,101 @@
+import tkinter as tk
+from bisect import bisect_left
+
+DEBOUNCE_MS = 250
+MAX_SUGGESTIONS = 8
+
+
+class CityIndex:
+    """
+    Lokalny indeks nazw miast do podpowiedzi. Nazwy są trzymane posortowane
+    (bez względu na wielkość liter), więc wyszukanie prefiksu to wyszukiwanie binarne.
+    """
+
+    def __init__(self, cities=()):
+        names = {}
+        for city in cities:
+            if city:
+                names.setdefault(city.casefold(), city)
+        self.entries = sorted(names.items())
+
+    def __len__(self):
+        return len(self.entries)
+
+    def cities(self):
+        return [city for _, city in self.entries]
+
+    def search(self, prefix, limit=MAX_SUGGESTIONS):
+        """Zwraca do `limit` nazw miast zaczynających się od podanego tekstu."""
+        prefix = prefix.strip().casefold()
+        if not prefix:
+            return []
+        result = []
+        i = bisect_left(self.entries, (prefix, ""))
+        while i < len(self.entries) and len(result) < limit:
+            key, city = self.entries[i]
+            if not key.startswith(prefix):
+                break
+            result.append(city)
+            i += 1
+        return result
+
+
+class CityAutocomplete:
+    """
+    Podpowiedzi nazw miast pod polem tekstowym. Wyszukiwanie uruchamiane jest dopiero
+    po DEBOUNCE_MS ms bez naciskania klawiszy, a lista jest nakładana na okno (place),
+    więc nie przesuwa pozostałych elementów interfejsu.
+    """
+
+    def __init__(self, entry, get_index, on_select):
+        self.entry = entry
+        self.get_index = get_index
+        self.on_select = on_select
+        self._after_id = None
+
+        self.listbox = tk.Listbox(entry.winfo_toplevel(), height=MAX_SUGGESTIONS, exportselection=False)
+        self.listbox.bind("<ButtonRelease-1>", lambda e: self.choose())
+        self.listbox.bind("<Return>", lambda e: self.choose())
+        self.listbox.bind("<Escape>", lambda e: self.hide())
+
+        entry.bind("<KeyRelease>", self.schedule, add="+")
+        entry.bind("<Down>", self.focus_list, add="+")
+        entry.bind("<Escape>", lambda e: self.hide(), add="+")
+
+    def schedule(self, event):
+        if event.keysym in ("Down", "Up", "Return", "Escape"):
+            return
+        if self._after_id is not None:
+            self.entry.after_cancel(self._after_id)
+        self._after_id = self.entry.after(DEBOUNCE_MS, self.update)
+
+    def update(self):
+        self._after_id = None
+        matches = self.get_index().search(self.entry.get())
+        if not matches:
+            self.hide()
+            return
+
+        self.listbox.delete(0, "end")
+        for city in matches:
+            self.listbox.insert("end", city)
+        self.listbox.config(height=len(matches))
+        self.listbox.place(in_=self.entry, x=0, rely=1, relwidth=1)
+        self.listbox.lift()
+
+    def focus_list(self, event):
+        if self.listbox.winfo_ismapped():
+            self.listbox.focus_set()
+            self.listbox.selection_set(0)
+
+    def choose(self):
+        selection = self.listbox.curselection()
+        if not selection:
+            return
+        city = self.listbox.get(selection[0])
+        self.hide()
+        self.entry.focus_set()
+        self.on_select(city)
+
+    def hide(self):
+        self.listbox.place_forget()
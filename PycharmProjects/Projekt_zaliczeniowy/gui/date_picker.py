@@ -0,0 +1,108 @@
+import calendar
+import tkinter as tk
+from tkinter import ttk
+from db.database import days_from_bitmap
+
+MONTH_NAMES = [
+    "styczeń", "luty", "marzec", "kwiecień", "maj", "czerwiec",
+    "lipiec", "sierpień", "wrzesień", "październik", "listopad", "grudzień"
+]
+WEEKDAY_NAMES = ["Pn", "Wt", "Śr", "Cz", "Pt", "So", "Nd"]
+
+
+class DatePicker(tk.Toplevel):
+    """
+    Okno wyboru daty w formie kalendarza: rok -> miesiąc -> dzień.
+
+    Dostępne dni pochodzą z map bitowych czujnika (słownik {rok: mapa}), więc okno
+    wyświetla zawsze najwyżej jeden miesiąc (42 przyciski) niezależnie od długości historii.
+    Aktywne są tylko dni, dla których zapisano pomiary.
+    """
+
+    def __init__(self, master, days_by_year, on_select, initial=None):
+        super().__init__(master)
+        self.title("Wybierz datę")
+        self.resizable(False, False)
+        self.transient(master)
+
+        self.days_by_year = days_by_year
+        self.on_select = on_select
+        self.year_var = tk.StringVar()
+        self.month_var = tk.StringVar()
+        self.months = []
+
+        top = ttk.Frame(self)
+        top.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
+        self.year_box = ttk.Combobox(top, textvariable=self.year_var, state="readonly", width=6,
+                                     values=[str(year) for year in sorted(days_by_year)])
+        self.year_box.grid(row=0, column=0, padx=5)
+        self.year_box.bind("<<ComboboxSelected>>", lambda e: self.show_year(int(self.year_var.get())))
+        self.month_box = ttk.Combobox(top, textvariable=self.month_var, state="readonly", width=22)
+        self.month_box.grid(row=0, column=1, padx=5)
+        self.month_box.bind("<<ComboboxSelected>>", lambda e: self.render())
+
+        grid = ttk.Frame(self)
+        grid.grid(row=1, column=0, padx=5, pady=5)
+        for col, name in enumerate(WEEKDAY_NAMES):
+            ttk.Label(grid, text=name, anchor="center", width=4).grid(row=0, column=col)
+
+        # Przyciski tworzone raz; przy zmianie miesiąca zmieniany jest tylko ich tekst i stan
+        self.buttons = []
+        for row in range(6):
+            for col in range(7):
+                button = ttk.Button(grid, width=4)
+                button.grid(row=row + 1, column=col, padx=1, pady=1)
+                self.buttons.append(button)
+
+        year, month = self._initial_month(initial)
+        self.year_var.set(str(year))
+        self.show_year(year, month)
+        self.grab_set()
+
+    def _initial_month(self, initial):
+        """
+        Zwraca (rok, miesiąc) do wyświetlenia: miesiąc wybranej wcześniej daty
+        albo ostatni miesiąc z pomiarami.
+        """
+        if initial:
+            year, month = int(initial[:4]), int(initial[5:7])
+            if days_from_bitmap(year, self.days_by_year.get(year, b""), month):
+                return year, month
+        year = max(self.days_by_year)
+        return year, days_from_bitmap(year, self.days_by_year[year])[-1].month
+
+    def show_year(self, year, month=None):
+        """
+        Wypełnia listę miesięcy roku (tylko miesiące z pomiarami, z liczbą dni) i pokazuje wybrany miesiąc.
+        """
+        counts = {}
+        for day in days_from_bitmap(year, self.days_by_year[year]):
+            counts[day.month] = counts.get(day.month, 0) + 1
+
+        self.months = sorted(counts)
+        self.month_box['values'] = [f"{MONTH_NAMES[m - 1]} ({counts[m]} dni)" for m in self.months]
+        self.month_box.current(self.months.index(month) if month in self.months else len(self.months) - 1)
+        self.render()
+
+    def render(self):
+        """
+        Rysuje siatkę dni wybranego miesiąca, włączając tylko dni z pomiarami.
+        """
+        year = int(self.year_var.get())
+        month = self.months[self.month_box.current()]
+        available = {day.day for day in days_from_bitmap(year, self.days_by_year[year], month)}
+
+        days = [day for week in calendar.monthcalendar(year, month) for day in week]
+        days += [0] * (len(self.buttons) - len(days))
+        for button, day in zip(self.buttons, days):
+            if day == 0:
+                button.config(text="", state="disabled", command="")
+            elif day in available:
+                button.config(text=str(day), state="normal",
+                              command=lambda d=day: self.select(f"{year:04d}-{month:02d}-{d:02d}"))
+            else:
+                button.config(text=str(day), state="disabled", command="")
+
+    def select(self, date_str):
+        self.on_select(date_str)
+        self.destroy()
@@ -0,0 +1,263 @@
+import argparse
+import hashlib
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import db.database as database
+
+POOL_SIZE = 4
+CACHE_SIZE = 256
+
+
+class ReadOnlyConnectionPool:
+    """
+    Pula połączeń SQLite otwartych w trybie tylko do odczytu.
+    Połączenia są tworzone przy pierwszym użyciu i współdzielone przez wątki obsługujące zapytania,
+    więc usługa może wystartować, zanim GUI utworzy plik bazy.
+    """
+
+    def __init__(self, db_path, size=POOL_SIZE):
+        self.db_path = db_path
+        self._connections = queue.Queue()
+        for _ in range(size):
+            self._connections.put(None)
+
+    @contextmanager
+    def connection(self):
+        conn = self._connections.get()
+        try:
+            if conn is None:
+                conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+            yield conn
+        finally:
+            self._connections.put(conn)
+
+    def close(self):
+        while not self._connections.empty():
+            conn = self._connections.get_nowait()
+            if conn is not None:
+                conn.close()
+
+
+class ResponseCache:
+    """
+    Pamięć podręczna odpowiedzi typu LRU. Każdy wpis jest oznaczony wersją danych;
+    zmiana wersji (nowy zapis do bazy) unieważnia całą zawartość.
+    """
+
+    def __init__(self, max_size=CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+                return None
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version, entry):
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+def data_version(db_path):
+    """
+    Zwraca wersję danych w bazie - czas modyfikacji pliku oraz licznik zmian z nagłówka SQLite
+    (bajty 24-27, zwiększany przy każdym zatwierdzonym zapisie, także z innego procesu, np. z GUI).
+    Zwraca None, jeśli plik bazy jeszcze nie istnieje.
+    """
+    try:
+        with open(db_path, "rb") as f:
+            f.seek(24)
+            change_counter = f.read(4)
+            return os.fstat(f.fileno()).st_mtime_ns, change_counter
+    except FileNotFoundError:
+        return None
+
+
+def find_stations(conn, city=None):
+    """Zwraca listę stacji zapisanych w bazie, opcjonalnie tylko z podanego miasta."""
+    cursor = conn.execute("SELECT id_stacji, name, lat, lon, city, street FROM stations ORDER BY city, name")
+    # Porównanie w Pythonie - lower() w SQLite nie obsługuje polskich znaków
+    return [
+        {"id": r[0], "name": r[1], "lat": r[2], "lon": r[3], "city": r[4], "street": r[5]}
+        for r in cursor.fetchall()
+        if city is None or (r[4] or "").lower() == city.lower()
+    ]
+
+
+def find_sensors(conn, station_id):
+    """Zwraca listę czujników zapisanych dla stacji."""
+    cursor = conn.execute("""
+        SELECT id_sensor, param_name, param_formula, param_code, param_id FROM sensors
+        WHERE station_id = ?
+        ORDER BY id_sensor
+    """, (station_id,))
+    return [
+        {"id": r[0], "param_name": r[1], "param_formula": r[2], "param_code": r[3], "param_id": r[4]}
+        for r in cursor.fetchall()
+    ]
+
+
+def _range_subquery(date_from, date_to):
+    """
+    Zapytanie zwracające szereg pomiarów czujnika w zakresie dat.
+    Pomiary zapisane wielokrotnie (kolejne pobrania z API) są uśredniane do jednej wartości na datę.
+    """
+    return """
+        SELECT date, AVG(value) AS value FROM measurements
+        WHERE sensor_id = ? AND value IS NOT NULL
+          AND (? IS NULL OR date >= ?)
+          AND (? IS NULL OR date <= ? || '~')
+        GROUP BY date
+    """, (date_from, date_from, date_to, date_to)
+
+
+def find_series(conn, sensor_id, date_from=None, date_to=None):
+    """Zwraca listę pomiarów (data, wartość) czujnika w zakresie dat YYYY-MM-DD."""
+    subquery, params = _range_subquery(date_from, date_to)
+    cursor = conn.execute(subquery + " ORDER BY date", (sensor_id, *params))
+    return [{"date": r[0], "value": r[1]} for r in cursor.fetchall()]
+
+
+def find_stats(conn, sensor_id, date_from=None, date_to=None):
+    """Zwraca liczbę pomiarów, minimum, maksimum (z datami) i średnią czujnika w zakresie dat."""
+    subquery, params = _range_subquery(date_from, date_to)
+    args = (sensor_id, *params)
+    count, avg = conn.execute(f"SELECT COUNT(*), AVG(value) FROM ({subquery})", args).fetchone()
+    if not count:
+        return {"count": 0, "min": None, "max": None, "avg": None}
+
+    min_row = conn.execute(f"SELECT date, value FROM ({subquery}) ORDER BY value, date LIMIT 1", args).fetchone()
+    max_row = conn.execute(f"SELECT date, value FROM ({subquery}) ORDER BY value DESC, date LIMIT 1", args).fetchone()
+    return {
+        "count": count,
+        "min": {"date": min_row[0], "value": min_row[1]},
+        "max": {"date": max_row[0], "value": max_row[1]},
+        "avg": round(avg, 2),
+    }
+
+
+ROUTES = [
+    (re.compile(r"^/stations$"), lambda conn, q: find_stations(conn, q.get("city"))),
+    (re.compile(r"^/stations/(\d+)/sensors$"), lambda conn, q, station_id: find_sensors(conn, int(station_id))),
+    (re.compile(r"^/sensors/(\d+)/series$"),
+     lambda conn, q, sensor_id: find_series(conn, int(sensor_id), q.get("from"), q.get("to"))),
+    (re.compile(r"^/sensors/(\d+)/stats$"),
+     lambda conn, q, sensor_id: find_stats(conn, int(sensor_id), q.get("from"), q.get("to"))),
+]
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    Obsługa zapytań GET. Odpowiedzi JSON są buforowane w ResponseCache
+    i oznaczane nagłówkiem ETag; klient z aktualnym ETagiem dostaje odpowiedź 304.
+    """
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        key = f"{url.path}?{url.query}"
+        version = data_version(self.server.db_path)
+
+        entry = self.server.cache.get(key, version)
+        if entry is None:
+            entry = self._build_response(url)
+            if entry[0] == 200:
+                self.server.cache.put(key, version, entry)
+
+        status, body, etag = entry
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _build_response(self, url):
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        for pattern, handler in ROUTES:
+            match = pattern.match(url.path)
+            if match:
+                try:
+                    with self.server.pool.connection() as conn:
+                        data = handler(conn, query, *match.groups())
+                except sqlite3.Error as e:
+                    return self._error_response(500, f"Błąd bazy danych: {e}")
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                return 200, body, f'"{hashlib.sha1(body).hexdigest()}"'
+
+        return self._error_response(404, f"Nieznany adres: {url.path}")
+
+    @staticmethod
+    def _error_response(status, message):
+        body = json.dumps({"error": message}, ensure_ascii=False).encode("utf-8")
+        return status, body, None
+
+    def log_message(self, format, *args):
+        pass
+
+
+class QueryServer(ThreadingHTTPServer):
+    """
+    Wielowątkowy serwer HTTP udostępniający dane z lokalnej bazy (tylko odczyt).
+    """
+    daemon_threads = True
+
+    def __init__(self, address, db_path=None, pool_size=POOL_SIZE, cache_size=CACHE_SIZE):
+        super().__init__(address, QueryHandler)
+        self.db_path = db_path or database.DB_PATH
+        self.pool = ReadOnlyConnectionPool(self.db_path, pool_size)
+        self.cache = ResponseCache(cache_size)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lokalna usługa HTTP/JSON z danymi o jakości powietrza.")
+    parser.add_argument("--host", default="127.0.0.1", help="Adres nasłuchiwania")
+    parser.add_argument("--port", type=int, default=8000, help="Port")
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE, help="Liczba połączeń do bazy")
+    args = parser.parse_args(argv)
+
+    server = QueryServer((args.host, args.port), pool_size=args.pool_size)
+    print(f"Usługa dostępna pod adresem http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import pytest
+import db.database as database
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """
+    Podmienia ścieżkę bazy danych na tymczasowy plik i tworzy w nim wszystkie tabele.
+    Zwraca ścieżkę pliku bazy.
+    """
+    path = str(tmp_path / "test.db")
+    monkeypatch.setattr(database, "DB_PATH", path)
+    database.create_table()
+    database.create_measurements_table()
+    database.create_sensors_table()
+    database.create_air_index_table()
+    return path
+
+
+@pytest.fixture
+def add_station(temp_db):
+    """
+    Zwraca funkcję zapisującą w tymczasowej bazie stację w formacie API GIOŚ.
+    """
+    def add(station_id, city="Warszawa", name=None):
+        database.insert_station({
+            "id": station_id, "stationName": name or f"Stacja {station_id}", "gegrLat": "52.2", "gegrLon": "21.0",
+            "city": {"name": city}, "addressStreet": "ul. Testowa"
+        })
+    return add
+
+
+@pytest.fixture
+def add_sensor(temp_db):
+    """
+    Zwraca funkcję zapisującą w tymczasowej bazie czujnik w formacie API GIOŚ.
+    """
+    def add(sensor_id, station_id, code="PM10", name=None):
+        database.insert_sensor({
+            "id": sensor_id, "stationId": station_id,
+            "param": {"paramName": name or code, "paramFormula": code, "paramCode": code, "idParam": 3}
+        })
+    return add
@@ -0,0 +1,68 @@
+import pytest
+import numpy as np
+import db.database as database
+from analysis.air_index import (
+    compute_sub_indices,
+    compute_all_sub_indices,
+    update_air_quality_index,
+    get_latest_indices,
+    NO_INDEX,
+)
+
+
+@pytest.fixture
+def station(add_station, add_sensor):
+    """
+    Zapisuje w tymczasowej bazie stację z czujnikami PM10 i NO2.
+    """
+    add_station(1)
+    add_sensor(10, 1, "PM10")
+    add_sensor(11, 1, "NO2")
+
+
+def test_compute_sub_indices_thresholds():
+    """
+    Testuje klasyfikację wartości PM10 według progów GIOŚ,
+    w tym wartości leżące dokładnie na granicy klasy.
+    """
+    result = compute_sub_indices([0, 20, 20.1, 50, 80, 110, 150, 150.1], "PM10")
+    assert list(result) == [0, 0, 1, 1, 2, 3, 4, 5]
+
+
+def test_compute_all_sub_indices_mixed_pollutants():
+    """
+    Testuje wyliczanie indeksów dla wymieszanych zanieczyszczeń
+    oraz oznaczanie zanieczyszczeń spoza indeksu wartością NO_INDEX.
+    """
+    result = compute_all_sub_indices(["PM10", "O3", "CO"], [60, 100, 500])
+    assert np.array_equal(result, [2, 1, NO_INDEX])
+
+
+def test_update_air_quality_index_incremental(station):
+    """
+    Testuje wyliczenie indeksu ogólnego jako najgorszego indeksu cząstkowego
+    oraz przyrostowe przeliczanie tylko godzin z nowymi pomiarami.
+    """
+    database.insert_measurements(10, "PM10", [
+        {"date": "2025-05-20 12:00:00", "value": 15.0},
+        {"date": "2025-05-20 13:00:00", "value": 60.0},
+    ])
+    database.insert_measurements(11, "NO2", [{"date": "2025-05-20 13:00:00", "value": 120.0}])
+
+    assert update_air_quality_index() == 2
+    assert update_air_quality_index() == 0
+
+    latest = get_latest_indices()
+    assert len(latest) == 1
+    assert latest[0]["hour"] == "2025-05-20 13:00"
+    assert latest[0]["sub_indices"]["PM10"] == 2
+    assert latest[0]["sub_indices"]["NO2"] == 2
+    assert latest[0]["sub_indices"]["O3"] is None
+
+    database.insert_measurements(11, "NO2", [{"date": "2025-05-20 14:00:00", "value": 250.0}])
+    assert update_air_quality_index() == 1
+
+    latest = get_latest_indices()
+    assert latest[0]["hour"] == "2025-05-20 14:00"
+    assert latest[0]["index_level"] == 4
+    assert latest[0]["index_name"] == "Zły"
@@ -0,0 +1,86 @@
+import csv
+import gzip
+import json
+import pytest
+import db.database as database
+from db.export import export_measurements, iter_measurement_chunks, detect_format, ExportError
+
+
+@pytest.fixture
+def measurements(add_sensor):
+    """
+    Zapisuje w tymczasowej bazie pomiary dwóch czujników z dwóch stacji.
+    """
+    for sensor_id, station_id, code in ((10, 1, "PM10"), (20, 2, "NO2")):
+        add_sensor(sensor_id, station_id, code)
+        database.insert_measurements(sensor_id, code, [
+            {"date": f"2025-05-{day:02d} {hour:02d}:00:00", "value": float(day * 100 + hour)}
+            for day in (20, 21, 22) for hour in range(24)
+        ])
+
+
+def test_iter_measurement_chunks_respects_chunk_size_and_filters(measurements):
+    """
+    Testuje, czy pomiary są zwracane w paczkach o zadanym rozmiarze
+    oraz czy filtr stacji i zakresu dat (obustronnie domkniętego) działa poprawnie.
+    """
+    chunks = list(iter_measurement_chunks(station_id=1, date_from="2025-05-21", date_to="2025-05-21", chunk_size=10))
+    assert [len(c) for c in chunks] == [10, 10, 4]
+
+    rows = [row for chunk in chunks for row in chunk]
+    assert {row[0] for row in rows} == {10}
+    assert {row[3][:10] for row in rows} == {"2025-05-21"}
+
+
+def test_export_csv_gzip(measurements, tmp_path):
+    """
+    Testuje eksport do skompresowanego pliku CSV z filtrem parametru.
+    """
+    path = str(tmp_path / "out.csv.gz")
+    count = export_measurements(path, param_key="NO2", chunk_size=7)
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert count == 72
+    assert rows[0] == ["sensor_id", "station_id", "param_key", "date", "value"]
+    assert rows[1] == ["20", "2", "NO2", "2025-05-20 00:00:00", "2000.0"]
+    assert len(rows) == 73
+
+
+def test_export_jsonl(measurements, tmp_path):
+    """
+    Testuje eksport do pliku JSON Lines z filtrem czujnika.
+    """
+    path = str(tmp_path / "out.jsonl")
+    assert export_measurements(path, sensor_id=10, date_to="2025-05-20") == 24
+
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert records[-1] == {
+        "sensor_id": 10, "station_id": 1, "param_key": "PM10", "date": "2025-05-20 23:00:00", "value": 2023.0
+    }
+
+
+def test_export_parquet(measurements, tmp_path):
+    """
+    Testuje eksport do pliku Parquet z filtrem stacji; każda paczka wierszy to osobna grupa wierszy.
+    """
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "out.parquet")
+    assert export_measurements(path, station_id=2, chunk_size=50) == 72
+
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.metadata.num_row_groups == 2
+    table = parquet_file.read()
+    assert table.column_names == ["sensor_id", "station_id", "param_key", "date", "value"]
+    assert set(table.column("sensor_id").to_pylist()) == {20}
+    assert table.column("date").to_pylist() == sorted(table.column("date").to_pylist())
+
+
+def test_detect_format_unknown_extension():
+    """
+    Testuje rozpoznawanie formatu po rozszerzeniu i błąd dla nieznanego rozszerzenia.
+    """
+    assert detect_format("dane.JSONL.gz") == "jsonl"
+    with pytest.raises(ExportError):
+        detect_format("dane.xlsx")
@@ -0,0 +1,114 @@
+import pytest
+import numpy as np
+import db.database as database
+from analysis.online_stats import P2Quantile, SensorAccumulator, FLATLINE_RUN, DROPOUT_HOURS
+
+
+def hourly(values, day=20):
+    """
+    Zamienia listę wartości na pomiary godzinowe w formacie API GIOŚ.
+    """
+    return [
+        {"date": f"2025-05-{day + hour // 24:02d} {hour % 24:02d}:00:00", "value": value}
+        for hour, value in enumerate(values)
+    ]
+
+
+def test_p2_quantile_approximates_median():
+    """
+    Testuje, czy przybliżona mediana z algorytmu P² jest bliska dokładnej.
+    """
+    rng = np.random.default_rng(1)
+    data = rng.normal(40, 10, 5000)
+    sketch = P2Quantile(0.5)
+    for x in data:
+        sketch.add(float(x))
+    assert sketch.value() == pytest.approx(np.median(data), abs=0.5)
+
+
+def test_accumulator_detects_spike_and_flatline():
+    """
+    Testuje wykrywanie skoku wartości oraz powtarzającej się wartości (płaska linia).
+    """
+    acc = SensorAccumulator(1)
+    measurements = hourly([20.0 + hour % 5 for hour in range(30)] + [200.0] + [22.0] * FLATLINE_RUN)
+    kinds = [kind for m in measurements for kind, _ in acc.update(m["date"], m["value"])]
+    assert kinds == ["spike", "flatline"]
+
+
+def test_accumulator_detects_dropout_from_missing_values():
+    """
+    Testuje liczenie serii pomiarów bez wartości oraz zgłoszenie przerwy dopiero po powrocie
+    wartości, tylko raz dla całej serii.
+    """
+    acc = SensorAccumulator(1)
+    measurements = hourly([10.0] + [None] * (DROPOUT_HOURS + 2) + [11.0])
+    found = []
+    for m in measurements:
+        if m["value"] is not None:
+            assert acc.stats()["missing_run"] == (DROPOUT_HOURS + 2 if acc.count else 0)
+        found += [(m["date"], kind) for kind, _ in acc.update(m["date"], m["value"])]
+    assert found == [(measurements[-1]["date"], "dropout")]
+    assert acc.count == 2
+    assert acc.stats()["missing_run"] == 0
+
+
+def test_insert_measurements_updates_stats_incrementally(temp_db):
+    """
+    Testuje, czy zapis pomiarów aktualizuje statystyki bieżące zgodne z obliczonymi wprost,
+    czy ponowny zapis tych samych danych ich nie zmienia oraz czy wykrywana jest przerwa w pomiarach.
+    """
+    values = [10.0, 12.0, None, 14.0, 16.0, 18.0, 20.0]
+    database.insert_measurements(5, "PM10", list(reversed(hourly(values))))
+    database.insert_measurements(5, "PM10", hourly(values))
+
+    stats = database.get_sensor_stats(5)
+    present = [v for v in values if v is not None]
+    assert stats["count"] == len(present)
+    assert stats["mean"] == pytest.approx(np.mean(present), abs=0.01)
+    assert stats["std"] == pytest.approx(np.std(present), abs=0.01)
+    assert stats["min"] == 10.0 and stats["max"] == 20.0
+
+    database.insert_measurements(5, "PM10", [{"date": "2025-05-20 12:00:00", "value": 21.0}])
+    assert database.get_sensor_stats(5)["count"] == len(present) + 1
+
+    anomalies = database.get_anomalies(5, "2025-05-20", "2025-05-20")
+    assert [a[1] for a in anomalies] == ["dropout"]
+    assert anomalies[0][0] == "2025-05-20 12:00:00"
+
+
+def test_missing_values_filled_in_later(temp_db):
+    """
+    Testuje, czy godziny pobrane najpierw bez wartości (jeszcze niezaraportowane),
+    a później z wartościami, są uwzględniane w statystykach i nie są zgłaszane jako przerwa.
+    """
+    values = [10.0, 12.0, 14.0, 16.0, 18.0, 10.0, 12.0, 14.0, 16.0, 18.0]
+    database.insert_measurements(5, "PM10", hourly(values[:5] + [None] * 5))
+    assert database.get_sensor_stats(5)["count"] == 5
+    assert database.get_sensor_stats(5)["missing_run"] == 5
+
+    database.insert_measurements(5, "PM10", hourly(values))
+    stats = database.get_sensor_stats(5)
+    assert stats["count"] == 10
+    assert stats["mean"] == pytest.approx(np.mean(values))
+    assert stats["missing_run"] == 0
+    assert database.get_anomalies(5) == []
+
+
+def test_sensor_stats_rebuilt_for_existing_database(temp_db):
+    """
+    Testuje jednorazowe zbudowanie statystyk i anomalii z pomiarów zapisanych przed dodaniem tabeli sensor_stats.
+    """
+    database.insert_measurements(5, "PM10", hourly([10.0, 12.0, None, 14.0]))
+    database.insert_measurements(5, "PM10", [{"date": "2025-05-20 12:00:00", "value": 21.0}])
+    expected = database.get_sensor_stats(5)
+
+    conn = database.create_connection()
+    conn.execute("DROP TABLE sensor_stats")
+    conn.execute("DELETE FROM anomalies")
+    conn.commit()
+    conn.close()
+
+    database.create_measurements_table()
+    assert database.get_sensor_stats(5) == expected
+    assert [a[1] for a in database.get_anomalies(5)] == ["dropout"]
@@ -0,0 +1,87 @@
+import pytest
+import numpy as np
+import db.database as database
+from analysis.parallel import sensor_summaries, station_summaries, merge_partials, summarize_segment, finalize
+
+
+@pytest.fixture
+def measurements(add_sensor):
+    """
+    Zapisuje w tymczasowej bazie trzy czujniki z pomiarami.
+    Czujnik 10 ma stały wzrost o 1 na godzinę, czyli trend 24 na dzień.
+    """
+    for sensor_id, station_id in ((10, 1), (11, 1), (12, 2)):
+        add_sensor(sensor_id, station_id)
+
+    database.insert_measurements(10, "PM10", [
+        {"date": f"2025-05-20 {hour:02d}:00:00", "value": float(hour)} for hour in range(24)
+    ])
+    database.insert_measurements(11, "PM10", [
+        {"date": f"2025-05-21 {hour:02d}:00:00", "value": 30.0 + hour % 3} for hour in range(24)
+    ])
+    database.insert_measurements(12, "PM10", [
+        {"date": "2025-05-20 01:00:00", "value": 5.0},
+        {"date": "2025-05-20 02:00:00", "value": None},
+        {"date": "2025-05-20 03:00:00", "value": 7.0},
+    ])
+
+
+def test_merge_partials_matches_full_computation():
+    """
+    Testuje, czy połączenie agregatów dwóch części szeregu daje
+    te same statystyki co obliczenie na całym szeregu.
+    """
+    rng = np.random.default_rng(0)
+    times = np.arange(100, dtype=float)
+    values = rng.normal(20, 5, 100)
+
+    merged = merge_partials(summarize_segment(times[:37], values[:37]), summarize_segment(times[37:], values[37:]))
+    full = summarize_segment(times, values)
+
+    for key in full:
+        assert merged[key] == pytest.approx(full[key])
+
+
+def test_sensor_summaries_parallel_matches_serial(measurements):
+    """
+    Testuje, czy wyniki z puli procesów (pamięć współdzielona) są takie same jak w trybie jednoprocesowym
+    oraz czy pomiary bez wartości są pomijane.
+    """
+    serial = sensor_summaries(workers=1)
+    parallel = sensor_summaries(workers=2)
+
+    assert serial == parallel
+    assert serial[10]["trend_per_day"] == pytest.approx(24.0)
+    assert serial[10]["min"] == 0.0 and serial[10]["max"] == 23.0
+    assert serial[12]["count"] == 2
+    assert serial[12]["mean"] == 6.0
+
+
+def test_repeated_writes_are_averaged(measurements):
+    """
+    Testuje, czy pomiary zapisane ponownie (kolejne pobranie tego samego okna z API)
+    są liczone raz na datę, tak samo w trybie jednoprocesowym i w puli procesów.
+    """
+    expected = sensor_summaries([10], workers=1)[10]
+    database.insert_measurements(10, "PM10", [
+        {"date": f"2025-05-20 {hour:02d}:00:00", "value": float(hour)} for hour in range(24)
+    ])
+
+    assert sensor_summaries([10], workers=1)[10] == expected
+    assert sensor_summaries([10], workers=2)[10] == expected
+    assert expected["count"] == 24
+
+
+def test_station_summaries_merges_sensors(measurements):
+    """
+    Testuje łączenie statystyk czujników tej samej stacji mierzących ten sam parametr.
+    """
+    result = station_summaries(workers=1)
+
+    assert set(result) == {(1, "PM10"), (2, "PM10")}
+    assert result[(1, "PM10")]["count"] == 48
+    assert result[(1, "PM10")]["max"] == 32.0
+    assert result[(1, "PM10")] == finalize(merge_partials(
+        summarize_segment(np.arange(24) / 24.0, np.arange(24, dtype=float)),
+        summarize_segment(1 + np.arange(24) / 24.0, 30.0 + np.arange(24) % 3),
+    ))
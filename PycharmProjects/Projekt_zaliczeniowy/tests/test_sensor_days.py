@@ -0,0 +1,84 @@
+import sqlite3
+from datetime import date
+import db.database as database
+from gui.autocomplete import CityIndex
+
+
+def test_sensor_days_bitmap(temp_db):
+    """
+    Testuje zaznaczanie dni z pomiarami w mapach bitowych (osobno dla każdego roku),
+    pomijanie pomiarów bez wartości oraz odczyt dni z wybranego miesiąca.
+    """
+    database.insert_measurements(10, "PM10", [
+        {"date": "2024-12-31 23:00:00", "value": 5.0},
+        {"date": "2025-01-01 00:00:00", "value": 6.0},
+        {"date": "2025-01-01 01:00:00", "value": 7.0},
+        {"date": "2025-02-10 00:00:00", "value": None},
+        {"date": "2025-03-15 12:00:00", "value": 8.0},
+    ])
+    database.insert_measurements(10, "PM10", [{"date": "2025-03-16 12:00:00", "value": 9.0}])
+
+    days = database.get_sensor_days(10)
+    assert sorted(days) == [2024, 2025]
+    assert all(len(bitmap) == database.DAYS_BITMAP_SIZE for bitmap in days.values())
+    assert database.days_from_bitmap(2024, days[2024]) == [date(2024, 12, 31)]
+    assert database.days_from_bitmap(2025, days[2025]) == [date(2025, 1, 1), date(2025, 3, 15), date(2025, 3, 16)]
+    assert database.days_from_bitmap(2025, days[2025], month=3) == [date(2025, 3, 15), date(2025, 3, 16)]
+    assert database.get_sensor_days(99) == {}
+
+
+def test_sensor_days_rebuilt_for_existing_database(temp_db):
+    """
+    Testuje jednorazowe zbudowanie map dni z pomiarów zapisanych przed dodaniem tabeli sensor_days.
+    """
+    conn = sqlite3.connect(database.DB_PATH)
+    conn.execute("INSERT INTO measurements (sensor_id, date, value, param_key) VALUES (5, '2025-05-20 10:00:00', 1.0, 'NO2')")
+    conn.execute("DROP TABLE sensor_days")
+    conn.commit()
+    conn.close()
+
+    database.create_measurements_table()
+    assert database.days_from_bitmap(2025, database.get_sensor_days(5)[2025]) == [date(2025, 5, 20)]
+
+
+def test_get_measurements_in_range(temp_db):
+    """
+    Testuje odczyt pomiarów z zakresu dni (obustronnie domkniętego) z uśrednieniem powtórzonych zapisów.
+    """
+    measurements = [
+        {"date": "2025-05-19 23:00:00", "value": 1.0},
+        {"date": "2025-05-20 10:00:00", "value": 2.0},
+        {"date": "2025-05-21 23:00:00", "value": 3.0},
+        {"date": "2025-05-22 00:00:00", "value": 4.0},
+    ]
+    database.insert_measurements(10, "PM10", measurements)
+    database.insert_measurements(10, "PM10", measurements)
+
+    assert database.get_measurements(10, "2025-05-20", "2025-05-21") == [
+        ("2025-05-20 10:00:00", 2.0), ("2025-05-21 23:00:00", 3.0)
+    ]
+
+
+def test_cities_and_stations_by_city(add_station):
+    """
+    Testuje listę miast z bazy oraz wyszukiwanie stacji miasta bez względu na wielkość liter (także polskich).
+    """
+    for station_id, city in ((1, "Łódź"), (2, "Łódź"), (3, "Kraków")):
+        add_station(station_id, city)
+
+    assert database.get_cities() == ["Kraków", "Łódź"]
+    stations = database.get_stations_by_city("łódź")
+    assert [s["id"] for s in stations] == [1, 2]
+    assert stations[0]["city"]["name"] == "Łódź"
+
+
+def test_city_index_prefix_search():
+    """
+    Testuje podpowiedzi miast po prefiksie (bez względu na wielkość liter) oraz limit liczby wyników i pomijanie powtórzonych nazw.
+    """
+    index = CityIndex(["Warszawa", "Wrocław", "Wałbrzych", "Kraków", "warszawa", ""])
+    assert len(index) == 4
+    assert index.search("w", limit=2) == ["Warszawa", "Wałbrzych"]
+    assert index.search("WR") == ["Wrocław"]
+    assert index.search("Gdańsk") == []
+    assert index.search("  ") == []
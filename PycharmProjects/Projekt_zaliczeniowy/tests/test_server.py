@@ -0,0 +1,125 @@
+import threading
+import pytest
+import requests
+import db.database as database
+from service.server import QueryServer, ResponseCache
+
+
+@pytest.fixture
+def server(add_station, add_sensor):
+    """
+    Uruchamia usługę na wolnym porcie z tymczasową bazą zawierającą jedną stację, czujnik i pomiary.
+    Zwraca adres bazowy usługi.
+    """
+    add_station(1)
+    add_sensor(10, 1, "PM10", "pył zawieszony PM10")
+    measurements = [
+        {"date": "2025-05-20 10:00:00", "value": 30.0},
+        {"date": "2025-05-20 11:00:00", "value": 10.0},
+        {"date": "2025-05-21 10:00:00", "value": 50.0},
+    ]
+    # Dwukrotny zapis tych samych danych nie może dublować pomiarów w odpowiedziach
+    database.insert_measurements(10, "PM10", measurements)
+    database.insert_measurements(10, "PM10", measurements)
+
+    srv = QueryServer(("127.0.0.1", 0))
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_stations_and_sensors(server):
+    """
+    Testuje wyszukiwanie stacji po mieście (bez względu na wielkość liter) i listę czujników stacji.
+    """
+    stations = requests.get(f"{server}/stations", params={"city": "warszawa"}).json()
+    assert [s["id"] for s in stations] == [1]
+    assert requests.get(f"{server}/stations", params={"city": "Kraków"}).json() == []
+
+    sensors = requests.get(f"{server}/stations/1/sensors").json()
+    assert sensors[0]["param_code"] == "PM10"
+
+
+def test_stations_polish_city_name(server, add_station):
+    """
+    Testuje wyszukiwanie stacji po nazwie miasta z polskimi znakami zapisanej inną wielkością liter.
+    """
+    add_station(2, "Łódź")
+    stations = requests.get(f"{server}/stations", params={"city": "łódź"}).json()
+    assert [s["id"] for s in stations] == [2]
+
+
+def test_series_and_stats_in_range(server):
+    """
+    Testuje szereg pomiarów i statystyki w zakresie dat (obustronnie domkniętym).
+    """
+    series = requests.get(f"{server}/sensors/10/series", params={"from": "2025-05-20", "to": "2025-05-20"}).json()
+    assert series == [{"date": "2025-05-20 10:00:00", "value": 30.0}, {"date": "2025-05-20 11:00:00", "value": 10.0}]
+
+    stats = requests.get(f"{server}/sensors/10/stats").json()
+    assert stats["count"] == 3
+    assert stats["min"] == {"date": "2025-05-20 11:00:00", "value": 10.0}
+    assert stats["max"]["value"] == 50.0
+    assert stats["avg"] == 30.0
+
+
+def test_etag_and_cache_invalidation(server):
+    """
+    Testuje odpowiedź 304 dla aktualnego ETagu oraz unieważnienie pamięci podręcznej po zapisie do bazy.
+    """
+    first = requests.get(f"{server}/sensors/10/stats")
+    etag = first.headers["ETag"]
+    assert requests.get(f"{server}/sensors/10/stats", headers={"If-None-Match": etag}).status_code == 304
+
+    database.insert_measurements(10, "PM10", [{"date": "2025-05-22 10:00:00", "value": 70.0}])
+
+    second = requests.get(f"{server}/sensors/10/stats", headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.json()["count"] == 4
+    assert second.headers["ETag"] != etag
+
+
+def test_unknown_path(server):
+    """
+    Testuje odpowiedź 404 dla nieznanego adresu.
+    """
+    assert requests.get(f"{server}/nieznany").status_code == 404
+
+
+def test_response_cache_lru_eviction():
+    """
+    Testuje usuwanie najdawniej używanego wpisu i czyszczenie pamięci podręcznej przy zmianie wersji danych.
+    """
+    cache = ResponseCache(max_size=2)
+    assert cache.get("a", 1) is None
+    cache.put("a", 1, "A")
+    cache.put("b", 1, "B")
+    cache.get("a", 1)
+    cache.put("c", 1, "C")
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == "A"
+    assert cache.get("a", 2) is None
+
+
+def test_missing_database_file(tmp_path, monkeypatch):
+    """
+    Testuje start usługi przed utworzeniem pliku bazy: zapytania zwracają błąd 500 w formacie JSON,
+    a po utworzeniu bazy usługa zaczyna zwracać dane.
+    """
+    db_path = str(tmp_path / "missing.db")
+    srv = QueryServer(("127.0.0.1", 0), db_path=db_path)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{srv.server_address[1]}/stations"
+    try:
+        response = requests.get(url)
+        assert response.status_code == 500
+        assert "error" in response.json()
+
+        monkeypatch.setattr(database, "DB_PATH", db_path)
+        database.create_table()
+        assert requests.get(url).json() == []
+    finally:
+        srv.shutdown()
+        srv.server_close()
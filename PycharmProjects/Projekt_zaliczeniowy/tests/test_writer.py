@@ -0,0 +1,186 @@
+import sqlite3
+import threading
+import pytest
+import db.database as database
+import db.writer as writer_module
+from db.writer import IngestWriter, IngestQueueFull, IngestWriterStopped
+
+
+def count_rows(table):
+    conn = database.create_connection()
+    count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_concurrent_producers_are_batched(temp_db):
+    """
+    Testuje zapis pomiarów z wielu wątków jednocześnie: wszystkie rekordy trafiają do bazy,
+    a liczba transakcji jest dużo mniejsza niż liczba wywołań put_measurements.
+    """
+    writer = IngestWriter(batch_size=500, flush_interval=0.5)
+
+    def produce(sensor_id):
+        for hour in range(100):
+            writer.put_measurements(sensor_id, "PM10", [
+                {"date": f"2025-05-{20 + hour // 24:02d} {hour % 24:02d}:00:00", "value": float(hour)}
+            ])
+
+    threads = [threading.Thread(target=produce, args=(sensor_id,)) for sensor_id in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert writer.flush().wait(timeout=10)
+    writer.close()
+
+    assert count_rows("measurements") == 800
+    assert count_rows("sensor_stats") == 8
+    assert writer.batches_committed < 20
+
+
+def test_stations_and_sensors_in_one_batch(temp_db):
+    """
+    Testuje zapis stacji i czujnika przez kolejkę oraz dostępność danych po flush().
+    """
+    writer = IngestWriter()
+    writer.put_station({
+        "id": 1, "stationName": "Stacja A", "gegrLat": "52.2", "gegrLon": "21.0",
+        "city": {"name": "Warszawa"}, "addressStreet": "ul. Testowa"
+    })
+    writer.put_sensor({
+        "id": 10, "stationId": 1,
+        "param": {"paramName": "PM10", "paramFormula": "PM10", "paramCode": "PM10", "idParam": 3}
+    })
+    assert writer.flush().wait(timeout=10)
+    writer.close()
+
+    assert count_rows("stations") == 1
+    assert count_rows("sensors") == 1
+
+
+def test_backpressure_when_queue_full(temp_db):
+    """
+    Testuje, czy przy pełnej kolejce producent, który nie może czekać, dostaje IngestQueueFull,
+    a po uruchomieniu wątku zapisującego dane są zapisywane.
+    """
+    writer = IngestWriter(max_queue=1, autostart=False)
+    writer.put_measurements(1, "PM10", [{"date": "2025-05-20 10:00:00", "value": 1.0}])
+    with pytest.raises(IngestQueueFull):
+        writer.put_measurements(1, "PM10", [{"date": "2025-05-20 11:00:00", "value": 2.0}], block=False)
+
+    writer.start()
+    assert writer.flush().wait(timeout=10)
+    writer.close()
+    assert count_rows("measurements") == 1
+
+
+def test_invalid_record_rejected_in_producer(temp_db):
+    """
+    Testuje, czy niekompletne dane stacji rzucają wyjątek już w put_station, a zapis pozostałych danych trwa dalej.
+    """
+    writer = IngestWriter()
+    with pytest.raises(KeyError):
+        writer.put_station({"id": 1})
+
+    writer.put_measurements(1, "PM10", [{"date": "2025-05-20 10:00:00", "value": 1.0}])
+    assert writer.flush().wait(timeout=10)
+    writer.close()
+    assert count_rows("measurements") == 1
+
+
+def test_failed_record_does_not_drop_batch(temp_db):
+    """
+    Testuje, czy rekord odrzucony przez bazę (niecałkowite ID stacji) jest zgłaszany przez uchwyt flush(),
+    a poprawne rekordy z tej samej paczki zostają zapisane.
+    """
+    writer = IngestWriter(flush_interval=1)
+    station = {
+        "id": 1, "stationName": "Stacja A", "gegrLat": "52.2", "gegrLon": "21.0",
+        "city": {"name": "Warszawa"}, "addressStreet": "ul. Testowa"
+    }
+    writer.put_station(station)
+    writer.put_station({**station, "id": "abc"})
+    writer.put_measurements(1, "PM10", [{"date": "2025-05-20 10:00:00", "value": 1.0}])
+    with pytest.raises(sqlite3.IntegrityError):
+        writer.flush().wait(timeout=10)
+    writer.close()
+
+    assert count_rows("stations") == 1
+    assert count_rows("measurements") == 1
+
+
+def test_locked_database_fails_whole_batch(temp_db, monkeypatch):
+    """
+    Testuje, czy przy bazie zablokowanej przez inny proces paczka nie jest ponawiana rekord po rekordzie,
+    a błąd blokady trafia do uchwytu flush() i zatrzymuje wątek zapisujący.
+    """
+    monkeypatch.setattr(writer_module, "BUSY_TIMEOUT", 0.1)
+    writer = IngestWriter(flush_interval=1)
+    attempts = []
+    write = writer._write
+    monkeypatch.setattr(writer, "_write", lambda conn, batch: attempts.append(len(batch)) or write(conn, batch))
+
+    lock = database.create_connection()
+    lock.execute("BEGIN EXCLUSIVE")
+    for hour in range(3):
+        writer.put_measurements(1, "PM10", [{"date": f"2025-05-20 {hour:02d}:00:00", "value": 1.0}])
+    with pytest.raises(sqlite3.OperationalError, match="locked"):
+        writer.flush().wait(timeout=10)
+    lock.rollback()
+    lock.close()
+
+    assert attempts == [3]
+    with pytest.raises(IngestWriterStopped):
+        writer.flush()
+
+
+def test_execute_runs_after_queued_records(temp_db):
+    """
+    Testuje, czy zadanie przekazane przez execute() jest wykonywane w wątku zapisującym po zapisaniu
+    wcześniej przekazanych rekordów, a jego błąd trafia tylko do jego uchwytu.
+    """
+    writer = IngestWriter(flush_interval=1)
+    writer.put_measurements(1, "PM10", [{"date": "2025-05-20 10:00:00", "value": 1.0}])
+    counts = []
+    assert writer.execute(lambda cursor: counts.append(
+        cursor.execute("SELECT COUNT(*) FROM measurements").fetchone()[0]
+    )).wait(timeout=10)
+    assert counts == [1]
+
+    with pytest.raises(sqlite3.OperationalError):
+        writer.execute(lambda cursor: cursor.execute("DELETE FROM brak")).wait(timeout=10)
+
+    assert writer.execute(database.clear_tables).wait(timeout=10)
+    writer.close()
+    assert count_rows("measurements") == 0
+
+
+def test_writer_failure_resolves_pending_flush(tmp_path):
+    """
+    Testuje, czy uchwyt flush() dostaje błąd, gdy wątek zapisujący nie może otworzyć bazy,
+    a kolejne wywołania put_* i flush() od razu rzucają IngestWriterStopped.
+    """
+    writer = IngestWriter(db_path=str(tmp_path / "brak" / "test.db"), autostart=False)
+    handle = writer.flush()
+    writer.start()
+    with pytest.raises(sqlite3.OperationalError):
+        handle.wait(timeout=10)
+
+    with pytest.raises(IngestWriterStopped):
+        writer.put_measurements(1, "PM10", [{"date": "2025-05-20 10:00:00", "value": 1.0}])
+    with pytest.raises(IngestWriterStopped):
+        writer.flush()
+
+
+def test_writer_rejects_records_after_close(temp_db):
+    """
+    Testuje, czy po close() rekordy nie są przyjmowane do kolejki, której nikt już nie odczytuje.
+    """
+    writer = IngestWriter()
+    writer.close()
+    with pytest.raises(IngestWriterStopped):
+        writer.put_measurements(1, "PM10", [{"date": "2025-05-20 10:00:00", "value": 1.0}])
+    with pytest.raises(IngestWriterStopped):
+        writer.flush()